@@ -4,7 +4,7 @@ This module contains various project shared datastructures.
 import numpy as np
 
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List
 
 @dataclass
 class Intervention:
@@ -12,6 +12,12 @@ class Intervention:
     end_day: int
     percent_reduction: float
 
+    @staticmethod
+    def from_string(intervention: str) -> 'Intervention':
+        """Parses an intervention parameter formatted "{day_start}, {day_end}, {effectiveness}"."""
+        start_day, end_day, percent_reduction = intervention.split(',')
+        return Intervention(int(start_day), int(end_day), float(percent_reduction))
+
 @dataclass
 class StudyParams:
     # Standard compartments
@@ -26,6 +32,11 @@ class StudyParams:
     network_param_1: float = 2.0
     network_param_2: float = 10.0
 
+    # Dynamics: 'stochastic', 'rejection_free' or 'discrete'
+    dynamics: str = 'stochastic'
+    steps_per_day: int = 10
+    ensemble_size: int = 1
+
     # Time parameters
     days_to_run: int = 350
     time_scale: float = 10.0
@@ -34,6 +45,21 @@ class StudyParams:
     intervention_1: str = None
     intervention_2: str = None
 
+    # Root seed of the random streams of every run; None draws a fresh one
+    seed: int = None
+
+    # Directory caching generated networks (None for no cache), and for randomize_network the number of networks the
+    # runs cycle through (0 for a new network every run)
+    network_cache: str = None
+    network_pool_size: int = 0
+
+    # For randomize_network, the number of runs ahead to build networks for in a background process (0 to build each
+    # network when its run starts)
+    network_prefetch: int = 0
+
+    # For network variability studies, take the network metrics from sampled degree sequences without wiring networks
+    metrics_only: bool = False
+
 @dataclass
 class VariabilityStudyParams(StudyParams):
     variability_method: str = 'balanced_polynomial'
@@ -44,20 +70,23 @@ class VariabilityStudyParams(StudyParams):
 @dataclass
 class SeriesRange:
     """Combines multiple data series, usually from separate runs of a simulation, into a mean, a low and a high.
-    The low and the high are one STD from the mean."""
+    The low and the high are one STD from the mean.  When built by a SeriesAggregator, quantiles holds a band for
+    each of its quantiles."""
     mean: List[float]
     high: List[float]
     low: List[float]
+    quantiles: Dict[float, np.ndarray] = None
 
     def create_from_list(self, data: List[List], expected_length: int = 0, smoothing: int = 0):
 
         if expected_length > 0:
-            for dat_list in data:
-                if len(dat_list) < expected_length:
-                    dat_list += [0] * (expected_length - len(dat_list))
+            data = [list(dat_list) + [0] * (expected_length - len(dat_list)) for dat_list in data]
 
-        self.mean = np.mean(data, axis=0)
-        std = np.std(data, axis=0)
+        return self.create_from_moments(np.mean(data, axis=0), np.std(data, axis=0), expected_length, smoothing)
+
+    def create_from_moments(self, mean: np.ndarray, std: np.ndarray, expected_length: int = 0, smoothing: int = 0):
+        """Sets the mean, high and low from the daily mean and standard deviation of the series."""
+        self.mean = mean
         self.high = self.mean + std
         self.low = self.mean - std
 
@@ -75,4 +104,3 @@ class SeriesRange:
             self.low = self.low[:expected_length]
 
         return self
-
@@ -0,0 +1,216 @@
+"""
+Vectorized discrete-time SIR dynamics.
+
+Rather than firing one event at a time as the Gillespie dynamics do, this engine advances the whole population in
+fixed time steps using NumPy operations over a CSRGraph.  In each step every SI edge transmits independently with
+the probability implied by the infection rate over the step (folding in the exposed node's susceptibility and any
+interventions in force), and every infected node is removed with the probability implied by the removal rate.  With
+several steps per day this closely approximates the continuous-time process at a fraction of the cost.
+
+Several independent replicates can be advanced together over the same network.  Their compartments form a
+replicates x nodes matrix, held flat so that node v of replicate k has flat id k * n + v, and each step's work is
+done for all replicates in the same NumPy operations.
+
+The results have the same keys as TrackedSIR.results(), and the same plugin hooks are called.
+"""
+import math
+import numpy as np
+
+from typing import Dict, List
+
+from epydemic import Process
+
+from covidsim.models import model_events
+from covidsim.models.interventions import InterventionSchedule
+from covidsim.models.node_state import NodeStateStore
+from covidsim.models.tracked_sir import TrackedSIR
+from covidsim.networks.csr_graph import CSRGraph
+
+
+class DiscreteTimeSIR:
+    DYNAMICS = 'discrete'
+    DEFAULT_STEPS_PER_DAY = 10
+
+    # Compartment codes
+    SUSCEPTIBLE = 0
+    INFECTED = 1
+    REMOVED = 2
+
+    def __init__(self, hook):
+        self.hook = hook
+        self.rng = np.random.default_rng()
+        self.timeseries_results = []
+        self.node_states = []
+        self.params = None
+        self.times = []
+        self.events = []
+        self._track_infections = True
+        self._track_removals = True
+        self._track_batches = True
+        self._batched = []
+
+    def run(self, g: CSRGraph, params: Dict) -> Dict:
+        """Runs one epidemic over the network until no nodes are infected, returning the results dict."""
+        return self.run_ensemble(g, params, 1)[0]
+
+    def run_ensemble(self, g: CSRGraph, params: Dict, replicates: int) -> List[Dict]:
+        """Runs independent epidemics over the network until none has any nodes infected, returning a results dict
+        for each.  The simulation time and number of events of each are left in times and events."""
+        self.params = params
+        n = g.number_of_nodes()
+
+        # Daily buffers for all replicates, one row each; days after days_to_run are beyond the horizon
+        daily_infections = np.zeros((replicates, params['days_to_run']), dtype=np.int64)
+        currently_infected = np.zeros((replicates, params['days_to_run']), dtype=np.int64)
+
+        self.node_states = [NodeStateStore(g) for _ in range(replicates)]
+        self.timeseries_results = [{'daily_infections': daily_infections[k],
+                                    'currently_infected': currently_infected[k]} for k in range(replicates)]
+        self.events = [0] * replicates
+        times = np.zeros(replicates)
+
+        # Only dispatch the events some plugin is listening for
+        self._track_infections = model_events.has_implementations(self.hook, 'track_infection_event')
+        self._track_removals = model_events.has_implementations(self.hook, 'track_remove_event')
+        self._track_batches = model_events.has_implementations(self.hook, 'track_infection_batch')
+        self._batched = [0] * replicates
+        for results in self.timeseries_results:
+            self.hook.initialize_results(results=results, params=params)
+
+        time_scale = params['time_scale']
+        steps_per_day = params['steps_per_day'] if 'steps_per_day' in params else self.DEFAULT_STEPS_PER_DAY
+        dt = 1.0 / (time_scale * steps_per_day)
+
+        if 'always_infect' in params and params['always_infect']:
+            p_infect = 1.0
+        else:
+            p_infect = params['pInfect']
+        p_remove_step = -math.expm1(-params['pRemove'] * dt)
+
+        interventions = InterventionSchedule.from_params(params)
+
+        # An infection along an edge succeeds with the exposed node's susceptibility, as in TrackedSIR
+        s = self.node_states[0].susceptibility
+        weights = np.where(np.isnan(s), 1.0, np.clip(s, 0.0, 1.0))
+
+        compartment = np.full(replicates * n, self.SUSCEPTIBLE, dtype=np.int8)
+        infected = np.flatnonzero(self.rng.random(replicates * n) < params['pInfected'])
+        compartment[infected] = self.INFECTED
+
+        max_days = int(math.ceil(Process.DEFAULT_MAX_TIME * time_scale))
+        day = 0
+        while len(infected) > 0 and day < max_days:
+            active = np.bincount(infected // n, minlength=replicates) > 0
+
+            # Per-node transmission probability along each SI edge for the steps of this day
+            scale = 1.0 - interventions.probability(day)
+            p_transmit = -np.expm1(-p_infect * scale * dt * weights)
+
+            infections_today = np.zeros(replicates, dtype=np.int64)
+            for _ in range(steps_per_day):
+                infecting, exposed = self._infections(g, compartment, infected, p_transmit, self.rng)
+                removing = self.rng.random(len(infected)) < p_remove_step
+                removed = infected[removing]
+
+                compartment[exposed] = self.INFECTED
+                compartment[removed] = self.REMOVED
+                self._record(infecting, exposed, removed, day, n, g)
+
+                infected = np.concatenate([infected[~removing], exposed])
+                infections_today += np.bincount(exposed // n, minlength=replicates)
+
+                if len(infected) == 0:
+                    break
+
+            self._dispatch_infection_batches(g)
+
+            if day < params['days_to_run']:
+                daily_infections[active, day] = infections_today[active]
+                currently_infected[active, day] = np.bincount(infected // n, minlength=replicates)[active]
+            times[active] = (day + 1) / time_scale
+            day += 1
+
+        self.times = times.tolist()
+
+        compartment = compartment.reshape(replicates, n)
+        results = []
+        for k in range(replicates):
+            res = dict()
+            res[TrackedSIR.SUSCEPTIBLE] = int(np.count_nonzero(compartment[k] == self.SUSCEPTIBLE))
+            res[TrackedSIR.INFECTED] = int(np.count_nonzero(compartment[k] == self.INFECTED))
+            res[TrackedSIR.REMOVED] = int(np.count_nonzero(compartment[k] == self.REMOVED))
+
+            self.hook.finalize_results(initial_results=self.timeseries_results[k], final_results=res, params=params)
+
+            mil = self.node_states[k].mean_infection_length()
+            res['mean_infection_length'] = mil
+            res['daily_r'] = TrackedSIR.daily_r(daily_infections[k], currently_infected[k], mil)
+            results.append(res)
+
+        return results
+
+    # --Private methods--
+
+    @staticmethod
+    def _infections(g: CSRGraph, compartment, infected, p_transmit, rng: np.random.Generator):
+        """Draws the transmissions along every SI edge in one step, for all replicates.  Returns the flat ids of
+        the infecting and newly infected nodes; a node reached along several edges is attributed to one of them at
+        random."""
+        n = g.number_of_nodes()
+        origin, neighbour = g.edges_from(infected % n)
+        src = infected[origin]
+        dst = src - src % n + neighbour
+
+        exposed = compartment[dst] == DiscreteTimeSIR.SUSCEPTIBLE
+        src = src[exposed]
+        dst = dst[exposed]
+
+        transmits = rng.random(len(dst)) < p_transmit[dst % n]
+        src = src[transmits]
+        dst = dst[transmits]
+
+        order = rng.permutation(len(dst))
+        dst, first = np.unique(dst[order], return_index=True)
+        return src[order][first], dst
+
+    def _record(self, infecting, exposed, removed, day, n, g):
+        """Records one step's events in the node state of each replicate, and passes them to the plugins."""
+        for k, sl in self._by_replicate(exposed, n):
+            state = self.node_states[k]
+            state.record_infections(infecting[sl] % n, exposed[sl] % n, day)
+            self.events[k] += len(sl)
+            if not self._track_infections:
+                continue
+            for j, x in zip((infecting[sl] % n).tolist(), (exposed[sl] % n).tolist()):
+                self.hook.track_infection_event(infecting_node=state.view(j), exposed_node=state.view(x), day=day,
+                                                results=self.timeseries_results[k], graph=g)
+
+        for k, sl in self._by_replicate(removed, n):
+            state = self.node_states[k]
+            state.record_removals(removed[sl] % n, day)
+            self.events[k] += len(sl)
+            if not self._track_removals:
+                continue
+            for x in (removed[sl] % n).tolist():
+                self.hook.track_remove_event(removed_node=state.view(x), day=day,
+                                             results=self.timeseries_results[k], graph=g)
+
+    def _dispatch_infection_batches(self, g):
+        """Passes each replicate's infections logged since its last batch to the batch trackers."""
+        for k, state in enumerate(self.node_states):
+            if self._track_batches and len(state.log_day) > self._batched[k]:
+                infecting, exposed, days = state.infection_log(self._batched[k])
+                self.hook.track_infection_batch(infecting_nodes=infecting, exposed_nodes=exposed, days=days,
+                                                node_state=state, results=self.timeseries_results[k], graph=g)
+            self._batched[k] = len(state.log_day)
+
+    @staticmethod
+    def _by_replicate(flat, n):
+        """Groups flat node ids by replicate, yielding each replicate with events and the positions of its events."""
+        if len(flat) == 0:
+            return
+        replicate = flat // n
+        order = np.argsort(replicate, kind='stable')
+        bounds = np.flatnonzero(np.diff(replicate[order])) + 1
+        for sl in np.split(order, bounds):
+            yield int(replicate[sl[0]]), sl
@@ -0,0 +1,98 @@
+"""
+Gillespie dynamics for processes whose event rates change at scheduled times.
+
+epydemic's StochasticDynamics assumes the event rates only change when an event fires.  Processes that fold
+time-dependent effects (such as interventions switching on and off) into their rates need the simulation to stop at
+each scheduled change and redraw the time to the next event, which is exact because the waiting times are memoryless.
+"""
+import math
+import numpy
+
+from epydemic import StochasticDynamics
+
+from covidsim.utils.random_streams import RandomStream
+
+
+class ScheduledStochasticDynamics(StochasticDynamics):
+    """Stochastic (Gillespie) dynamics that respects scheduled rate changes.
+
+    A process may define nextRateChange(t), returning the next time after t at which its event rates change (or None).
+    If the next event would fall after that time, the simulation instead advances to the change and redraws.
+    Processes without nextRateChange run exactly as under StochasticDynamics.
+
+    The event times and choices are drawn from the RandomStream in random, which may be replaced before a run to
+    control the random numbers used.
+
+    :param p: the process to run
+    :param g: prototype network to run the dynamics over (optional, can be provided later)"""
+
+    def __init__(self, p, g=None):
+        super(ScheduledStochasticDynamics, self).__init__(p, g)
+        self.random = RandomStream(numpy.random.default_rng())
+
+    def do(self, params):
+        """Run the simulation using Gillespie dynamics.
+
+        :param params: the experimental parameters
+        :returns: the experimental results dict"""
+        proc = self.process()
+        next_rate_change = getattr(proc, 'nextRateChange', None)
+
+        t = 0
+        events = 0
+        while not proc.atEquilibrium(t):
+            transitions = proc.eventRateDistribution(t)
+
+            # compute the total rate of transitions for the entire network
+            a = 0.0
+            for (_, r, _) in transitions:
+                a = a + r
+
+            tc = next_rate_change(t) if next_rate_change is not None else None
+            if a == 0.0:
+                if tc is None:
+                    break  # no events with non-zero rates, and none to come
+                t = tc
+                events = events + self.runPendingEvents(t)
+                continue
+
+            # calculate the timestep delta
+            r1 = self.random.random()
+            dt = (1.0 / a) * math.log(1.0 / r1)
+
+            # if the rates change before the next event, move to the change and redraw
+            if tc is not None and t + dt > tc:
+                t = tc
+                events = events + self.runPendingEvents(t)
+                continue
+
+            # calculate which event happens
+            (l, _, ef) = transitions[0]
+            if len(transitions) > 1:
+                r2 = self.random.random()
+                xc = r2 * a
+
+                xs = 0
+                for v in range(0, len(transitions)):
+                    (l, xsp, ef) = transitions[v]
+                    if (xs + xsp) > xc:
+                        break
+                    else:
+                        xs = xs + xsp
+
+            # increment the time
+            t = t + dt
+
+            # fire any events posted for at or before this time
+            events = events + self.runPendingEvents(t)
+
+            if len(l) > 0:
+                e = l.draw()
+                ef(t, e)
+                events = events + 1
+
+        (self.metadata())[self.TIME] = t
+        (self.metadata())[self.EVENTS] = events
+
+        rc = self.experimentalResults()
+        return rc
@@ -6,27 +6,62 @@ import networkx as nx
 import pluggy
 
 from dataclasses import asdict
-from typing import Dict
+from typing import Dict, List
 from epydemic import *
 from epyc import labnotebook
 
-from covidsim.datastructures import SeriesRange, StudyParams
+from covidsim.datastructures import StudyParams
+from covidsim.dynamics.discrete_time import DiscreteTimeSIR
+from covidsim.dynamics.scheduled_stochastic import ScheduledStochasticDynamics
 from covidsim.models.tracked_sir import TrackedSIR
-from covidsim.networks.powerlaw_cutoff import make_powerlaw_with_cutoff, generate_from
+from covidsim.networks.configuration_model import giant_component_mask
+from covidsim.networks.csr_graph import CSRGraph
+from covidsim.networks.erdos_renyi import erdos_renyi_csr
+from covidsim.networks.graph_cache import GraphCache
+from covidsim.networks.powerlaw_cutoff import powerlaw_with_cutoff_distribution, generate_csr_from_distribution, \
+    sample_degrees
 from covidsim.networks.network_manipulations import NetworkInitialization
+from covidsim.utils.prefetch import Prefetcher
+from covidsim.utils.random_streams import RandomStream, generator_for_run, network_generator, node_generator
+from covidsim.utils.streaming_stats import SeriesAggregator
 
 from covidsim.models import model_events
 
 
-class BaseExperiment(StochasticDynamics):
-    def __init__(self, params: StudyParams):
+class BaseExperiment(ScheduledStochasticDynamics):
+    REPLICATE = 'replicate'  #: Metadata element holding the index of a result within its ensemble.
+    SEED = 'seed'            #: Metadata element holding the root seed of the run's random streams.
+    RUN_INDEX = 'run_index'  #: Metadata element holding the index of the run, which selects its random streams.
 
-        if params.randomize_network:
+    MAXDEG = 100  #: Maximum node degree of powerlaw_cutoff networks.
+
+    #: Parameters that, with the root seed and run index, determine the network of a randomize_network run.
+    NETWORK_PARAMETERS = ('network_type', 'population', 'network_param_1', 'network_param_2', 'network_pool_size',
+                          'variability_method', 'variability_param_1', 'variability_param_2')
+
+    def __init__(self, params: StudyParams, network: CSRGraph = None):
+        """:param params: the study parameters
+        :param network: the fixed network to run over, with its nodes initialized, instead of building one (for
+            example a network attached from shared memory)"""
+        self.study_params = params
+
+        # Each run draws from streams derived from the root seed and its run index; see covidsim.utils.random_streams
+        self.root_seed = params.seed if params.seed is not None else np.random.SeedSequence().entropy
+        self.run_index = 0
+        self.rng = np.random.default_rng(np.random.SeedSequence(self.root_seed))
+        self.graph_cache = GraphCache(params.network_cache) if params.network_cache is not None else None
+        self.prefetcher = Prefetcher(self.run_network, params.network_prefetch) if params.network_prefetch > 0 \
+            else None
+
+        # A network given as a CSRGraph is only converted for the dynamics if a run needs it
+        self._csr = network
+        self._networkx_pending = network is not None
+
+        if params.randomize_network or params.metrics_only or network is not None:
             self._g = nx.erdos_renyi_graph(2, 1.0)  # Dummy graph
         else:
-            self._g = self.generate_graph(params.network_type, params.population,
-                                          params.network_param_1, params.network_param_2)
-            NetworkInitialization(asdict(params)).setup_nodes(self._g)
+            self._g = self.study_network(asdict(params), self.root_seed, 0)
+            NetworkInitialization(asdict(params), self.rng).setup_nodes(self._g)
 
         # Setup the plugin manager
         pm = pluggy.PluginManager("infectionmodel")
@@ -35,39 +70,202 @@ class BaseExperiment(StochasticDynamics):
 
         self.plugins = pm
 
-        # Create the model
+        # Create the model, and the discrete-time engine used instead when params select it
         p = TrackedSIR(pm.hook)
+        self.discrete = DiscreteTimeSIR(pm.hook)
 
         super(BaseExperiment, self).__init__(p, self._g)
 
-    def do(self, params, run_simulation: bool = False):
+    def setUp(self, params):
+        self._start_run(params)
+
+        # Metrics-only runs never build a network
+        if self.is_metrics_only(params):
+            return
+
+        # A fresh network has to be in place before the dynamics copies it for the run
         if params['randomize_network']:
-            # Generate graph.
-            self._g = self.generate_graph(params['network_type'], params['population'],
-                                          params['network_param_1'], params['network_param_2'])
-            NetworkInitialization(params).setup_nodes(self._g)
+            self._next_network(params)
+
+        # The discrete-time engine works on its own array copy of the network
+        if not self.is_discrete(params):
+            if self._networkx_pending:
+                self._g = self._csr.to_networkx()
+                self.setNetworkPrototype(self._g)
+                self._networkx_pending = False
+            super(BaseExperiment, self).setUp(params)
 
+    def do(self, params, run_simulation: bool = False):
         res = {}
         if run_simulation:
-            res = super(BaseExperiment, self).do(params)
+            if self.is_metrics_only(params):
+                raise ValueError('metrics_only runs have no network to simulate over')
+            if self.is_discrete(params):
+                res = self.discrete.run(self.csr_graph(), params)
+                (self.metadata())[self.TIME] = self.discrete.times[0]
+                (self.metadata())[self.EVENTS] = self.discrete.events[0]
+            else:
+                res = super(BaseExperiment, self).do(params)
         return res
 
+    def run_ensemble(self, params) -> List[Dict]:
+        """Runs ensemble_size replicates of the epidemic together over the current network with the discrete-time
+        engine, returning a (results, metadata) pair for each."""
+        if not self.is_discrete(params):
+            raise ValueError("Ensemble runs need dynamics='{d}'".format(d=DiscreteTimeSIR.DYNAMICS))
+
+        results = self.discrete.run_ensemble(self.csr_graph(), params, params['ensemble_size'])
+
+        ensemble = []
+        for i, res in enumerate(results):
+            metadata = {self.STATUS: True,
+                        self.SEED: self.metadata()[self.SEED],
+                        self.RUN_INDEX: self.metadata()[self.RUN_INDEX],
+                        self.REPLICATE: i,
+                        self.TIME: self.discrete.times[i],
+                        self.EVENTS: self.discrete.events[i]}
+            ensemble.append((res, metadata))
+        return ensemble
+
+    def csr_graph(self) -> CSRGraph:
+        """Array form of the current network, converted once per network."""
+        if self._csr is None:
+            self._csr = CSRGraph.from_networkx(self._g)
+        return self._csr
+
+    def study_network(self, params, root_seed: int, index: int) -> nx.Graph:
+        """The index'th network of the root seed for the study parameters, without node state.  It is taken from
+        the network cache if there is one, and built and added to it if need be."""
+        return self.study_csr(params, root_seed, index, self.graph_cache).to_networkx()
+
+    def _next_network(self, params):
+        """Puts the network of the current run in place, as the prototype the dynamics copies.  With prefetching,
+        the networks of the next network_prefetch runs, assumed to have the same network parameters, are built in
+        the background meanwhile."""
+        root_seed, run = self.metadata()[self.SEED], self.metadata()[self.RUN_INDEX]
+        if self.prefetcher is None:
+            g = self.run_network(params, root_seed, run, self.graph_cache)
+        else:
+            network_params = {k: params[k] for k in self.NETWORK_PARAMETERS if k in params}
+            key = tuple(sorted(network_params.items())) + (root_seed,)
+            upcoming = [(key + (i,), (network_params, root_seed, i, self.graph_cache))
+                        for i in range(run + 1, run + 1 + self.study_params.network_prefetch)]
+            g = self.prefetcher.get(key + (run,), (network_params, root_seed, run, self.graph_cache), upcoming)
+
+        self._g = g.to_networkx()
+        self._csr = g
+        self.setNetworkPrototype(self._g)
+
+    @classmethod
+    def study_csr(cls, params, root_seed: int, index: int, graph_cache: GraphCache = None) -> CSRGraph:
+        """As study_network, as a CSRGraph."""
+        def build():
+            return cls.generate_csr(params['network_type'], params['population'],
+                                    params['network_param_1'], params['network_param_2'],
+                                    network_generator(root_seed, index), cls.MAXDEG)
+
+        if graph_cache is None:
+            return build()
+        key = GraphCache.key(params['network_type'], params['population'],
+                             params['network_param_1'], params['network_param_2'], cls.MAXDEG, [root_seed, index])
+        return graph_cache.get(key, build)
+
+    @classmethod
+    def run_network(cls, params, root_seed: int, run_index: int, graph_cache: GraphCache = None) -> CSRGraph:
+        """The network of a randomize_network run, as a CSRGraph with its nodes initialized from the run's node
+        stream.  Depends only on its arguments, so can be built ahead of the run in another process."""
+        g = cls.study_csr(params, root_seed, cls.network_index(params, run_index), graph_cache)
+        g = CSRGraph(g.offsets, g.neighbours, edge_layers=g.edge_layers)
+        NetworkInitialization(params, node_generator(root_seed, run_index)).setup_nodes(g)
+        return g
+
+    @classmethod
+    def run_degrees(cls, params, root_seed: int, run_index: int) -> np.ndarray:
+        """The degree sequence of a run's network, sampled as it would be to build the network, but without wiring
+        it: the giant component that powerlaw_cutoff networks are trimmed to is approximated from the degrees.
+        Each randomize_network run has its own, and otherwise every run has the same one."""
+        index = cls.network_index(params, run_index) if params['randomize_network'] else 0
+        return cls.generate_degrees(params['network_type'], params['population'],
+                                    params['network_param_1'], params['network_param_2'],
+                                    network_generator(root_seed, index), cls.MAXDEG)
+
+    @staticmethod
+    def network_index(params, run_index: int) -> int:
+        """The index of the network for a run: runs cycle through a pool of network_pool_size networks, or
+        each has its own network if the pool size is 0."""
+        if 'network_pool_size' in params and params['network_pool_size'] > 0:
+            return run_index % params['network_pool_size']
+        return run_index
+
+    def _start_run(self, params):
+        """Draws the random streams of the next run, and records where they came from in the metadata.  A seed in
+        params overrides the experiment's root seed."""
+        root_seed = params['seed'] if 'seed' in params and params['seed'] is not None else self.root_seed
+        self.rng = generator_for_run(root_seed, self.run_index)
+        self.random = self.process().random = RandomStream(self.rng)
+        self.discrete.rng = self.rng
+
+        (self.metadata())[self.SEED] = root_seed
+        (self.metadata())[self.RUN_INDEX] = self.run_index
+        self.run_index += 1
+
     @staticmethod
-    def generate_graph(network_type: str, population: int, param1: float, param2: float):
+    def is_discrete(params) -> bool:
+        return 'dynamics' in params and params['dynamics'] == DiscreteTimeSIR.DYNAMICS
+
+    @staticmethod
+    def is_ensemble(params) -> bool:
+        return 'ensemble_size' in params and params['ensemble_size'] > 1
+
+    @staticmethod
+    def is_metrics_only(params) -> bool:
+        return 'metrics_only' in params and params['metrics_only']
+
+    @staticmethod
+    def generate_graph(network_type: str, population: int, param1: float, param2: float,
+                       rng: np.random.Generator = None, maxdeg: int = MAXDEG) -> nx.Graph:
         """Generates a network according to the study parameters"""
+        return BaseExperiment.generate_csr(network_type, population, param1, param2, rng, maxdeg).to_networkx()
+
+    @staticmethod
+    def generate_csr(network_type: str, population: int, param1: float, param2: float,
+                     rng: np.random.Generator = None, maxdeg: int = MAXDEG) -> CSRGraph:
+        """Generates a network according to the study parameters, as a CSRGraph"""
         g = None
         if network_type == 'powerlaw_cutoff':
-            g = generate_from(population,
-                              make_powerlaw_with_cutoff(param1, param2))
+            _, cdf = powerlaw_with_cutoff_distribution(param1, param2, maxdeg)
+            g = generate_csr_from_distribution(population, cdf, rng)
 
         else:  # default to erdos_renyi
             kmean = param1  # mean node degree
             phi = (kmean + 0.0) / population  # probability of attachment between two nodes chosen at random
 
-            g = nx.erdos_renyi_graph(population, phi)
+            g = erdos_renyi_csr(population, phi, rng)
 
         return g
 
+    @staticmethod
+    def generate_degrees(network_type: str, population: int, param1: float, param2: float,
+                         rng: np.random.Generator = None, maxdeg: int = MAXDEG,
+                         giant_component: bool = True) -> np.ndarray:
+        """Samples the node degrees of a network generated according to the study parameters, without generating
+        it.  The nodes outside the giant component of a powerlaw_cutoff network are approximately trimmed, as the
+        network generator trims them, unless giant_component is False."""
+        if rng is None:
+            rng = np.random.default_rng()
+
+        if network_type == 'powerlaw_cutoff':
+            _, cdf = powerlaw_with_cutoff_distribution(param1, param2, maxdeg)
+            degrees = sample_degrees(population, cdf, rng)
+            if giant_component:
+                degrees = degrees[giant_component_mask(degrees, rng)]
+
+        else:  # default to erdos_renyi
+            phi = (param1 + 0.0) / population
+            degrees = rng.binomial(population - 1, phi, size=population)
+
+        return degrees
+
     @staticmethod
     def aggregate_results(nb: labnotebook, params: StudyParams, series_to_smooth: Dict = {'daily_r': 5}):
         """Aggregates results across multiple experiments."""
@@ -76,25 +274,24 @@ class BaseExperiment(StochasticDynamics):
         aggregated_results = {}
         timeseries_results = {}
 
+        # Fold each run's timeseries in as it is read, rather than holding them all
         for result in results:
             if result['metadata']['status']:
                 for key in result['results']:
-                    if type(result['results'][key]) is list:
-                        if key in timeseries_results:
-                            timeseries_results[key].append(result['results'][key][:params.days_to_run])
-                        else:
-                            timeseries_results[key] = [result['results'][key][:params.days_to_run]]
+                    # Timeseries are lists, or arrays when read from a BinaryLabNotebook
+                    if isinstance(result['results'][key], (list, np.ndarray)):
+                        if key not in timeseries_results:
+                            timeseries_results[key] = SeriesAggregator(
+                                params.days_to_run, smoothing=(series_to_smooth[key] if key in series_to_smooth else 0))
+                        timeseries_results[key].add(result['results'][key])
 
         for key in timeseries_results:
-            aggregated_results[key] = SeriesRange(None, None, None).create_from_list(
-                timeseries_results[key],
-                expected_length=params.days_to_run,
-                smoothing=(series_to_smooth[key] if key in series_to_smooth else 0))
+            aggregated_results[key] = timeseries_results[key].series_range()
 
         # TODO: Is this part necessary?  Maybe just use built in dataframe method instead?
         for result in [x['results'] for x in results if x['metadata']['status']][:1]:
             for key in result:
-                if not type(result[key]) is list:
+                if not isinstance(result[key], (list, np.ndarray)):
                     aggregated_results[key] = np.mean([x['results'][key] for x in results if x['metadata']['status']])
 
         return aggregated_results
@@ -0,0 +1,350 @@
+"""
+Lab notebook that appends each result to a binary file.
+
+epyc's JSONLabNotebook rewrites the whole notebook as indented JSON on every commit, with timeseries as lists of
+numbers, so saving gets slower as the notebook grows.  BinaryLabNotebook instead appends each result to its file as
+a record when it is added, so adding a result costs only the size of that result.  A record holds the result's
+timeseries as int32 or float32 blocks, followed by its parameters, metadata and scalar results as JSON.  Reading a
+notebook memory-maps the file, and the timeseries of the results read are NumPy arrays viewing the mapped blocks.
+
+The file is the header record followed by the result records, each framed by its length and a CRC32 checksum.
+commit() flushes the file and fsyncs it.  A record that was only partly written when a process died fails its
+checksum, so on opening the notebook it is dropped, along with anything after it, and the notebook carries on from the
+last complete record.
+
+Beside the notebook is a ParameterIndex, giving the parameter hash and file offset of each result.  Results are
+only read from the file when asked for, so resultsFor() reads just the records of its point, and resultsAlong()
+those of the points of a sweep.  An index that doesn't match the file is rebuilt from the records on opening.
+
+Results read back from the file are not quite the results that were added.  Each numeric timeseries (a non-empty
+list or 1-d array of numbers, booleans included) comes back as a read-only NumPy array viewing the mapped file: int32
+if every value is an integer that fits, so booleans become 0 and 1, and float32 otherwise, so float64 values keep
+only float32's precision (about 7 significant figures).  dataframe() cells hold these arrays where a JSONLabNotebook's
+would hold lists.  Results added since the notebook was opened are held as they were added until it is reopened.
+
+Pending results are kept in memory only, as they are not needed by Lab.
+"""
+import json
+import os
+import struct
+import zlib
+import numpy as np
+
+import epyc
+
+from datetime import datetime
+from epyc import Experiment
+from epyc.jsonlabnotebook import MetadataEncoder
+from typing import Any, Dict, List
+
+from covidsim.experiments.parameter_index import ParameterIndex, canonical_parameters, parameter_hash
+
+
+class BinaryLabNotebook(epyc.LabNotebook):
+    """A lab notebook that appends its results to a binary file.
+
+    :param name: file to persist the notebook to
+    :param create: if True, erase any existing file rather than loading it (defaults to False)
+    :param description: free text description of the notebook"""
+
+    MAGIC = b'CSNB0001'                 #: First bytes of a notebook file.
+    FRAME = struct.Struct('<II')        #: Each record starts with its payload length and CRC32.
+    PREFIX = struct.Struct('<II')       #: Each payload starts with the offset and length of its JSON part.
+    ALIGNMENT = 8                       #: Records and timeseries blocks start at multiples of this in the file.
+
+    INDEX_SUFFIX = '.idx'               #: Suffix of the index file kept beside the notebook.
+
+    HEADER = 'header'
+    RESULT = 'result'
+
+    def __init__(self, name: str, create: bool = False, description: str = None):
+        super(BinaryLabNotebook, self).__init__(name, description)
+        self._file = None
+        self._loaded = set()
+        self._points = dict()
+
+        create = create or not os.path.isfile(name) or os.path.getsize(name) == 0
+        self._index = ParameterIndex(name + self.INDEX_SUFFIX, create=create)
+        if create:
+            self._create(name)
+        self._load(name)
+        self._file = open(name, 'r+b')
+        self._file.seek(0, os.SEEK_END)
+
+    @classmethod
+    def from_json(cls, json_name: str, name: str = None, defaults: dict = None) -> 'BinaryLabNotebook':
+        """Converts a JSONLabNotebook file to a new binary notebook, with its description and completed results.
+
+        Parameters added to a study since its results were recorded are missing from those results, so they would
+        never match resultsFor() the current parameters.  Given defaults, each result takes any parameter it lacks
+        from them, so results recorded before a parameter existed match the parameter's default, which reproduces
+        the old behaviour.
+
+        :param json_name: the JSON notebook file
+        :param name: file for the binary notebook, which is overwritten (defaults to json_name with a .nb extension)
+        :param defaults: values of the parameters the results may lack (defaults to none)
+        :returns: the binary notebook"""
+        if not os.path.isfile(json_name):
+            raise FileNotFoundError('No JSON notebook {n}'.format(n=json_name))
+        if name is None:
+            name = os.path.splitext(json_name)[0] + '.nb'
+
+        json_nb = epyc.JSONLabNotebook(json_name)
+        nb = cls(name, create=True, description=json_nb.description())
+        for res in json_nb.results():
+            if defaults is not None:
+                res = dict(res)
+                res[Experiment.PARAMETERS] = dict(defaults, **res[Experiment.PARAMETERS])
+            nb.addResult(res)
+        nb.commit()
+        return nb
+
+    def isPersistent(self) -> bool:
+        """Return True to indicate the notebook is persisted to a file.
+
+        :returns: True"""
+        return True
+
+    def commit(self):
+        """Flushes the results appended to the file, and syncs it to disk, and then its index."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._index.commit()
+
+    def close(self):
+        """Commits and closes the file and its index.  Results already read stay readable."""
+        if self._file is not None:
+            self.commit()
+            self._file.close()
+            self._file = None
+            self._index.close()
+
+    def _parametersAsIndex(self, ps: dict) -> int:
+        """Keys results by the hash of their canonical parameters, so 10 and 10.0 are the same point."""
+        return parameter_hash(ps)
+
+    def addResult(self, result, jobids=None):
+        """Adds a result, as LabNotebook.addResult, appending it to the file.  LabNotebook.addResult unwraps lists
+        of results and repeated results by adding each of them in turn, so only single results dicts are written
+        here."""
+        if isinstance(result, dict) and not isinstance(result[Experiment.RESULTS], list):
+            k = self._parametersAsIndex(result[Experiment.PARAMETERS])
+            self._read_point(k)
+            self._points.setdefault(k, canonical_parameters(result[Experiment.PARAMETERS]))
+            self._index.add(k, self._file.tell())
+            self._file.write(self._encode_result(result))
+        super(BinaryLabNotebook, self).addResult(result, jobids)
+
+    def resultsFor(self, ps: dict) -> List[dict]:
+        """Return the results for the given parameters, reading only their records from the file.
+
+        :param ps: the parameters
+        :returns: a list of results, which may be empty"""
+        self._read_point(self._parametersAsIndex(ps))
+        return super(BinaryLabNotebook, self).resultsFor(ps)
+
+    def results(self) -> List[dict]:
+        """Return all the results, reading any not yet read from the file.
+
+        :returns: a list of results"""
+        for k in self._index.hashes():
+            self._read_point(k)
+        return super(BinaryLabNotebook, self).results()
+
+    def resultsAlong(self, ps: dict, axis: str, low: float = None, high: float = None) -> Dict[Any, List[dict]]:
+        """Return the results at every point of a sweep along one parameter, with the other parameters fixed.
+
+        :param ps: the parameters, whose value for the axis is ignored
+        :param axis: the parameter swept
+        :param low: the least value of the axis to include (defaults to no limit)
+        :param high: the greatest value of the axis to include (defaults to no limit)
+        :returns: a dict from each value of the axis, in canonical form and in increasing order, to its results"""
+        fixed = canonical_parameters({p: v for (p, v) in ps.items() if p != axis})
+        along = dict()
+        for k in self._index.hashes():
+            point = self._point(k)
+            if axis not in point or {p: v for (p, v) in point.items() if p != axis} != fixed:
+                continue
+            v = point[axis]
+            if (low is None or v >= low) and (high is None or v <= high):
+                self._read_point(k)
+                along[v] = [res for res in self._results[k] if isinstance(res, dict)]
+        return {v: along[v] for v in sorted(along.keys())}
+
+    def _read_point(self, k: int):
+        """Reads the results recorded for a parameter hash, if not already read."""
+        if k in self._loaded:
+            return
+        self._loaded.add(k)
+        offsets = self._index.offsets(k)
+        if len(offsets) > 0:
+            # Newest first, as LabNotebook.addResult keeps them, after anything already held for the point
+            self._results.setdefault(k, []).extend([self._read_result(o) for o in reversed(offsets)])
+
+    def _point(self, k: int) -> dict:
+        """The canonical parameters of a parameter hash, read from its first record."""
+        if k not in self._points:
+            (payload, _) = self._frame(self._data, self._index.offsets(k)[0], verify=False)
+            self._points[k] = canonical_parameters(self._document(payload)[Experiment.PARAMETERS])
+        return self._points[k]
+
+    # ---------- Records ----------
+
+    def _create(self, name: str):
+        with open(name, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(self._record({'kind': self.HEADER, 'description': self.description()}))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _encode_result(self, res: dict) -> bytes:
+        """Encodes a single result as a record, with its numeric timeseries as blocks."""
+        doc = {'kind': self.RESULT,
+               Experiment.PARAMETERS: res[Experiment.PARAMETERS],
+               Experiment.METADATA: res[Experiment.METADATA],
+               Experiment.RESULTS: None,
+               'timeseries': dict()}
+        blocks = []
+        if res[Experiment.RESULTS] is not None:
+            doc[Experiment.RESULTS] = dict()
+            offset = self.PREFIX.size
+            for (k, v) in res[Experiment.RESULTS].items():
+                block = self._timeseries_block(v)
+                if block is None:
+                    doc[Experiment.RESULTS][k] = v
+                else:
+                    doc['timeseries'][k] = [block.dtype.str, len(block), offset]
+                    blocks.append(block)
+                    offset += self._padded(block.nbytes)
+        return self._record(doc, blocks)
+
+    def _record(self, doc: dict, blocks=()) -> bytes:
+        """Frames a record: the blocks, each padded to the alignment, then the JSON document, which gives the
+        offsets of the blocks within the payload."""
+        parts = []
+        offset = self.PREFIX.size
+        for block in blocks:
+            data = block.tobytes()
+            parts.append(data + bytes(self._padded(len(data)) - len(data)))
+            offset += len(parts[-1])
+        text = json.dumps(doc, cls=_Encoder).encode('utf-8')
+
+        payload = self.PREFIX.pack(offset, len(text)) + b''.join(parts) + text
+        payload += bytes(self._padded(len(payload)) - len(payload))
+        return self.FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+    @classmethod
+    def _padded(cls, n: int) -> int:
+        return -(-n // cls.ALIGNMENT) * cls.ALIGNMENT
+
+    @staticmethod
+    def _timeseries_block(v) -> np.ndarray:
+        """A numeric timeseries as an int32 block if it holds only integers that fit, or a float32 block if it holds
+        other numbers; None for values that are not timeseries."""
+        if isinstance(v, np.ndarray):
+            if v.ndim != 1 or len(v) == 0 or v.dtype.kind not in 'biuf':
+                return None
+            values = v
+        elif isinstance(v, list) and len(v) > 0 and \
+                all(isinstance(x, (int, float, np.integer, np.floating)) for x in v):
+            values = np.array(v)
+        else:
+            return None
+
+        if values.dtype.kind in 'biu':
+            info = np.iinfo(np.int32)
+            if np.all(values >= info.min) and np.all(values <= info.max):
+                return values.astype('<i4')
+        return values.astype('<f4')
+
+    def _load(self, name: str):
+        """Checks the file against its index, and indexes any complete records after the last one indexed, which
+        will have been written just before a crash.  Truncates any incomplete record at the end of the file."""
+        data = self._map(name)
+        if bytes(data[:len(self.MAGIC)]) != self.MAGIC:
+            raise ValueError('{n} is not a binary lab notebook'.format(n=name))
+        header = self._frame(data, len(self.MAGIC))
+        if header is None:
+            raise ValueError('{n} has no complete header'.format(n=name))
+        self._description = self._document(header[0])['description']
+        position = header[1]
+
+        last = self._index.last_offset()
+        if last is not None:
+            indexed = self._frame(data, last)
+            if indexed is None:
+                # The index doesn't match the file, so rebuild it from the records
+                self._index.close()
+                self._index = ParameterIndex(name + self.INDEX_SUFFIX, create=True)
+            else:
+                position = indexed[1]
+
+        indexed = len(self._index)
+        while True:
+            record = self._frame(data, position)
+            if record is None:
+                break
+            self._index.add(parameter_hash(self._document(record[0])[Experiment.PARAMETERS]), position)
+            position = record[1]
+        if len(self._index) > indexed:
+            self._index.commit()
+
+        if position < len(data):
+            # Drop the partly-written record at the end, so that new records follow on from complete ones
+            del data
+            with open(name, 'r+b') as f:
+                f.truncate(position)
+            data = self._map(name)
+        self._data = data
+
+    @staticmethod
+    def _map(name: str) -> np.ndarray:
+        return np.memmap(name, dtype=np.uint8, mode='r').view(np.ndarray)
+
+    def _frame(self, data: np.ndarray, position: int, verify: bool = True):
+        """The payload of the record at a position and the position after it, or None if there is no complete
+        record there."""
+        start = position + self.FRAME.size
+        if start > len(data):
+            return None
+        (length, crc) = self.FRAME.unpack(bytes(data[position:start]))
+        if start + length > len(data):
+            return None
+        payload = data[start:start + length]
+        if verify and zlib.crc32(payload) != crc:
+            return None
+        return (payload, start + length)
+
+    def _document(self, payload: np.ndarray) -> dict:
+        (text_offset, text_length) = self.PREFIX.unpack(bytes(payload[:self.PREFIX.size]))
+        return json.loads(bytes(payload[text_offset:text_offset + text_length]).decode('utf-8'))
+
+    def _read_result(self, offset: int) -> dict:
+        (payload, _) = self._frame(self._data, offset, verify=False)
+        return self._result(self._document(payload), payload)
+
+    def _result(self, doc: dict, payload: np.ndarray) -> dict:
+        """Rebuilds a results dict from a record, with timeseries viewing the memory-mapped payload."""
+        metadata = doc[Experiment.METADATA]
+        if metadata.get(Experiment.STATUS):
+            for k in [Experiment.START_TIME, Experiment.END_TIME]:
+                if isinstance(metadata.get(k), str):
+                    metadata[k] = datetime.fromisoformat(metadata[k])
+
+        results = doc[Experiment.RESULTS]
+        for (k, (dtype, n, offset)) in doc['timeseries'].items():
+            dtype = np.dtype(dtype)
+            results[k] = payload[offset:offset + n * dtype.itemsize].view(dtype)
+
+        return {Experiment.PARAMETERS: doc[Experiment.PARAMETERS],
+                Experiment.METADATA: metadata,
+                Experiment.RESULTS: results}
+
+
+class _Encoder(MetadataEncoder):
+    """Encodes the NumPy scalars and arrays that results may hold as their Python equivalents."""
+
+    def default(self, o):
+        if isinstance(o, (np.generic, np.ndarray)):
+            return o.tolist()
+        return super(_Encoder, self).default(o)
@@ -4,45 +4,47 @@ Network variability study.
 The purpose of this study is to examine how individual total susceptibility within a population varies depending
 on network variability (how exposed an individual is to other nodes) vs. latent variability.
 
-It does not run a simulation; it only creates networks and get metrics from them.
+It does not run a simulation; it only creates networks and get metrics from them.  Since the metrics depend only on
+the node degrees and susceptibilities, with metrics_only set it does not even wire the networks, but samples degree
+sequences and takes the metrics from those, which is fast enough to sweep thousands of parameter points.
 """
-import numpy as np
-
 from covidsim.datastructures import VariabilityStudyParams
 from covidsim.experiments.base_experiment import BaseExperiment
+from covidsim.networks.csr_graph import CSRGraph
+from covidsim.networks.metrics import network_metrics
+from covidsim.networks.network_manipulations import NetworkInitialization
+from covidsim.utils.random_streams import node_generator
 
 
 class NetworkVariabilityExperiment(BaseExperiment):
 
-    def __init__(self, params: VariabilityStudyParams):
+    def __init__(self, params: VariabilityStudyParams, network: CSRGraph = None):
 
-        super(NetworkVariabilityExperiment, self).__init__(params)
+        super(NetworkVariabilityExperiment, self).__init__(params, network)
 
     def do(self, params, run_simulation: bool = False):
+        if self.is_metrics_only(params) and not run_simulation:
+            return self._do_metrics_only(params)
+
         res = super(NetworkVariabilityExperiment, self).do(params, run_simulation)
 
         # Gather custom results
-        g = self._g
-
-        res['population_size'] = len(g.nodes)
+        g = self.csr_graph()
 
-        # TODO: Move some of these metrics to a network class?
-        res['graph_cov'] = np.std([x[1] for x in g.degree]) / np.mean([x[1] for x in g.degree])
+        res['population_size'] = g.number_of_nodes()
+        res.update(network_metrics(g.degrees(), g.node_attributes['susceptibility']))
 
-        res['mean_individual_susceptibility'] = np.mean([g.nodes[x[0]]['susceptibility'] for x in g.degree])
-        res['std_individual_susceptibility'] = np.std([g.nodes[x[0]]['susceptibility'] for x in g.degree])
-
-        mean_exposure_susceptibility = np.mean(
-            [1.0 - (1.0 - g.nodes[x[0]]['susceptibility']) ** x[1] for x in g.degree])
-        std_exposure_susceptibility = np.std([1.0 - (1.0 - g.nodes[x[0]]['susceptibility']) ** x[1] for x in g.degree])
-
-        coeff_of_variation = std_exposure_susceptibility / mean_exposure_susceptibility
+        return res
 
-        res['mean_exposure_susceptibility'] = mean_exposure_susceptibility
-        res['std_exposure_susceptibility'] = std_exposure_susceptibility
-        res['exposure_susceptibility_cov'] = coeff_of_variation
-        res['individual_cov'] = res['std_individual_susceptibility'] / res['mean_individual_susceptibility']
+    def _do_metrics_only(self, params):
+        """The network metrics of a sampled degree sequence, with susceptibilities drawn for its nodes."""
+        root_seed, run = self.metadata()[self.SEED], self.metadata()[self.RUN_INDEX]
+        degrees = self.run_degrees(params, root_seed, run)
+        susceptibility = NetworkInitialization(params, node_generator(root_seed, run)).susceptibilities(len(degrees))
 
+        res = dict()
+        res['population_size'] = len(degrees)
+        res.update(network_metrics(degrees, susceptibility))
         return res
 
 
@@ -0,0 +1,209 @@
+"""
+Lab that runs experiments in parallel across a pool of local worker processes.
+
+epyc's Lab runs every repetition at every point of the parameter space one after another in a single process.
+ParallelLab hands each (point, repetition) to a pool of worker processes instead.  Each worker builds its own copy of
+the experiment, with its own graph and plugin manager, from the experiment's class and study parameters, and results
+are added to the notebook as they finish.
+"""
+import collections.abc
+import os
+import random
+import traceback
+import numpy as np
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import replace
+
+import epyc
+
+from epyc import Experiment, RepeatedExperiment
+
+from covidsim.networks.shared_graph import SharedGraph, attach
+
+
+class ParallelLab(epyc.Lab):
+    """A lab that runs repetitions of an experiment across a pool of worker processes.
+
+    The experiment passed to runExperiment() may be a BaseExperiment, or a RepeatedExperiment wrapping one.  Workers
+    rebuild the experiment as experiment.__class__(experiment.study_params), so the experiment object itself is never
+    sent between processes.
+
+    Each run of a BaseExperiment draws from random streams chosen by the experiment's root seed and the run's index
+    (see covidsim.utils.random_streams).  Workers are given the root seed of the experiment passed in, and each task
+    is given the index it would have had if the runs were done one after another, so a sweep gives the same results
+    however it is spread over the pool.
+
+    An exception raised by the experiment is recorded as a failed result by the experiment itself, as under Lab.  A
+    worker process dying outright breaks every run in progress in the pool, so each of those runs is rerun on its
+    own in a fresh pool.  A run that kills its worker while running alone is retried up to retries times, and then
+    recorded as a failed result, so one crashing run neither aborts the sweep nor takes the runs beside it down with
+    it.
+
+    With shared_network set, an experiment over a fixed network (without randomize_network) publishes its network's
+    arrays to shared memory, and the workers attach to them rather than each building a copy (see
+    covidsim.networks.shared_graph), so the network takes its memory once rather than once per worker.  Runs with the
+    discrete-time engine use the shared arrays directly; the stochastic dynamics still need a networkx copy of the
+    network in each worker.
+
+    :param notebook: the notebook used to store results (defaults to an empty LabNotebook)
+    :param cores: number of worker processes (defaults to the number of cores)
+    :param retries: number of times to retry a run whose worker process died
+    :param shared_network: share a fixed network between the workers through shared memory"""
+
+    def __init__(self, notebook=None, cores: int = None, retries: int = 1, shared_network: bool = False):
+        super(ParallelLab, self).__init__(notebook)
+        self._cores = cores if cores is not None else os.cpu_count()
+        self._retries = retries
+        self._shared_network = shared_network
+
+    def cores(self) -> int:
+        """Number of worker processes used to run experiments."""
+        return self._cores
+
+    def addParameter(self, k, r):
+        """Adds a parameter to the experiment's parameter space, as Lab.addParameter, which relies on the
+        collections.Iterable alias removed in Python 3.10."""
+        if isinstance(r, str) or not isinstance(r, collections.abc.Iterable):
+            r = [r]
+        else:
+            r = list(r)
+        self._parameters[k] = r
+
+    def runExperiment(self, e):
+        """Runs an experiment over all the points in the parameter space, spreading the runs over the pool.  The
+        results are added to the notebook in the order they finish.
+
+        :param e: the experiment, or a RepeatedExperiment wrapping it"""
+        if isinstance(e, RepeatedExperiment):
+            experiment, repetitions = e.experiment(), e.repetitions()
+        else:
+            experiment, repetitions = e, 1
+
+        # One task for each repetition at each point, numbered in the order Lab would run them
+        tasks = dict()
+        for params in self.parameterSpace():
+            for i in range(repetitions):
+                tasks[len(tasks)] = (params, i)
+        attempts = {k: 0 for k in tasks}
+
+        # Only cores tasks are in flight at a time, so a worker dying can only break the tasks actually running.  The
+        # tasks it breaks are then rerun one at a time, so that only the task that crashes on its own is charged with
+        # the crash
+        nb = self.notebook()
+        pending = deque(tasks.keys())
+        isolated = deque()
+        running = dict()
+        alone = None
+        pool = None
+        shared = self._share_network(experiment) if self._shared_network else None
+        try:
+            while len(pending) > 0 or len(isolated) > 0 or len(running) > 0:
+                if pool is None:
+                    pool = ProcessPoolExecutor(max_workers=self.cores(), initializer=_initialise_worker,
+                                               initargs=(experiment.__class__, self._study_params(experiment),
+                                                         shared.handle if shared is not None else None))
+                if len(isolated) > 0:
+                    if len(running) == 0:
+                        alone = isolated.popleft()
+                        running[pool.submit(_run, tasks[alone][0], alone)] = alone
+                else:
+                    while len(pending) > 0 and len(running) < self.cores():
+                        k = pending.popleft()
+                        running[pool.submit(_run, tasks[k][0], k)] = k
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                if any(isinstance(f.exception(), BrokenProcessPool) for f in done):
+                    # Every task still in flight was broken with the pool, unless it finished first
+                    pool.shutdown()
+                    pool = None
+                    if len(running) == 1:
+                        alone = next(iter(running.values()))
+                    done = list(running.keys())
+
+                for f in done:
+                    k = running.pop(f)
+                    if k == alone:
+                        alone = None
+                    elif isinstance(f.exception(), BrokenProcessPool):
+                        # Broken alongside other tasks, so rerun it alone before charging it with the crash
+                        isolated.append(k)
+                        continue
+                    (params, i) = tasks[k]
+                    try:
+                        res = f.result()
+                    except BrokenProcessPool as ex:
+                        # Crashed on its own, so retry it alone if it has retries left
+                        attempts[k] += 1
+                        if attempts[k] <= self._retries:
+                            isolated.appendleft(k)
+                            continue
+                        res = self._failed(params, ex)
+                    nb.addResult(self._repetition(res, i, repetitions))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            if shared is not None:
+                shared.close()
+
+        nb.commit()
+
+    @staticmethod
+    def _study_params(experiment):
+        """The study parameters for the workers to build the experiment from, with the experiment's root seed."""
+        if hasattr(experiment, 'root_seed'):
+            return replace(experiment.study_params, seed=experiment.root_seed)
+        return experiment.study_params
+
+    @staticmethod
+    def _share_network(experiment):
+        """Publishes the experiment's fixed network to shared memory, or returns None if it has none."""
+        params = getattr(experiment, 'study_params', None)
+        if not hasattr(experiment, 'csr_graph') or params.randomize_network or params.metrics_only:
+            return None
+        return SharedGraph(experiment.csr_graph())
+
+    @staticmethod
+    def _repetition(res, i: int, repetitions: int):
+        """Adds the repetition metadata that RepeatedExperiment would, to a result and any results embedded in it."""
+        embedded = res[Experiment.RESULTS] if isinstance(res[Experiment.RESULTS], list) else []
+        for r in [res] + embedded:
+            r[Experiment.METADATA][RepeatedExperiment.I] = i
+            r[Experiment.METADATA][RepeatedExperiment.REPETITIONS] = repetitions
+        return res
+
+    @staticmethod
+    def _failed(params, ex: Exception):
+        """A failed results dict, laid out as Experiment.run() reports an experiment that raised an exception."""
+        return {Experiment.PARAMETERS: params.copy(),
+                Experiment.METADATA: {Experiment.STATUS: False,
+                                      Experiment.EXCEPTION: ex,
+                                      Experiment.TRACEBACK: ''.join(traceback.format_exception(type(ex), ex,
+                                                                                               ex.__traceback__))},
+                Experiment.RESULTS: None}
+
+
+# The experiment each worker process builds once and then runs for every task it is given
+_experiment = None
+
+
+def _initialise_worker(experiment_class, study_params, network=None):
+    global _experiment
+
+    # Forked workers inherit the parent's random state, so would otherwise share it in experiments without their
+    # own random streams
+    random.seed()
+    np.random.seed()
+
+    if network is not None:
+        _experiment = experiment_class(study_params, network=attach(network))
+    else:
+        _experiment = experiment_class(study_params)
+
+
+def _run(params, run_index: int):
+    if hasattr(_experiment, 'run_index'):
+        _experiment.run_index = run_index
+    return _experiment.set(params).run()
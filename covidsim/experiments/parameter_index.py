@@ -0,0 +1,121 @@
+"""
+Index from experiment parameters to the results recorded for them.
+
+epyc keys a notebook's results by the parameters written out as a string, so 10 and 10.0 are different points, and
+the key of a parameter dict read back from a file need not match the key of the dataclass it was written from.
+Parameters are instead reduced to a canonical form, with every number as a float, and keyed by a 64-bit hash of
+that.  A ParameterIndex is a file of fixed-width (hash, offset) entries beside a BinaryLabNotebook, appended to as
+results are added, so the results for a point can be found without reading the rest of the notebook.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+
+from typing import Any, Dict, List
+
+
+def canonical_value(v: Any) -> Any:
+    """A parameter value reduced to JSON types, with numbers (other than booleans) as floats."""
+    if isinstance(v, (bool, np.bool_)):
+        return bool(v)
+    if isinstance(v, (int, float, np.integer, np.floating)):
+        return float(v) + 0.0   # so that -0.0 is 0.0
+    if isinstance(v, (list, tuple, np.ndarray)):
+        return [canonical_value(x) for x in v]
+    if v is None or isinstance(v, str):
+        return v
+    return str(v)
+
+
+def canonical_parameters(ps: Dict[str, Any]) -> Dict[str, Any]:
+    """Parameters with each value in canonical form."""
+    return {k: canonical_value(v) for (k, v) in ps.items()}
+
+
+def parameter_hash(ps: Dict[str, Any]) -> int:
+    """A 64-bit hash of the canonical form of the parameters, the same for 10 as for 10.0."""
+    text = json.dumps(canonical_parameters(ps), sort_keys=True, allow_nan=True)
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class ParameterIndex:
+    """The hash of the parameters and file offset of each result in a notebook, persisted to a file.
+
+    :param name: file to persist the index to
+    :param create: if True, erase any existing file rather than loading it (defaults to False)"""
+
+    MAGIC = b'CSIX0001'                                         #: First bytes of an index file.
+    ENTRY = np.dtype([('hash', '<u8'), ('offset', '<u8')])      #: Each entry of the file.
+
+    def __init__(self, name: str, create: bool = False):
+        self._name = name
+        self._offsets = dict()
+        self._entries = 0
+        self._last = None
+
+        if create or not os.path.isfile(name) or not self._load(name):
+            with open(name, 'wb') as f:
+                f.write(self.MAGIC)
+            self._offsets = dict()
+            self._entries = 0
+            self._last = None
+        self._file = open(name, 'ab')
+
+    def _load(self, name: str) -> bool:
+        """Reads the entries of the file, dropping any partly-written entry at its end.  Returns False if the file
+        is not an index."""
+        with open(name, 'rb') as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC:
+                return False
+            entries = np.frombuffer(f.read(), dtype=np.uint8)
+        whole = len(entries) - len(entries) % self.ENTRY.itemsize
+        if whole < len(entries):
+            with open(name, 'r+b') as f:
+                f.truncate(len(self.MAGIC) + whole)
+        entries = entries[:whole].view(self.ENTRY)
+
+        if len(entries) > 0:
+            # Group the offsets by hash, keeping them in the order they were added
+            order = np.argsort(entries['hash'], kind='stable')
+            hashes = entries['hash'][order]
+            starts = np.flatnonzero(np.r_[True, hashes[1:] != hashes[:-1]])
+            for (h, offsets) in zip(hashes[starts].tolist(), np.split(entries['offset'][order], starts[1:])):
+                self._offsets[h] = offsets.tolist()
+            self._last = int(entries['offset'][-1])
+        self._entries = len(entries)
+        return True
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def last_offset(self) -> int:
+        """The offset of the result added last, or None if there are none."""
+        return self._last
+
+    def hashes(self) -> List[int]:
+        """The distinct parameter hashes of the results."""
+        return list(self._offsets.keys())
+
+    def offsets(self, h: int) -> List[int]:
+        """The offsets of the results with the given parameter hash, in the order they were added."""
+        return self._offsets.get(h, [])
+
+    def add(self, h: int, offset: int):
+        """Adds the result at an offset."""
+        self._file.write(np.array([(h, offset)], dtype=self.ENTRY).tobytes())
+        self._offsets.setdefault(h, []).append(offset)
+        self._entries += 1
+        self._last = offset
+
+    def commit(self):
+        """Flushes the entries added to the file, and syncs it to disk."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        """Commits and closes the file."""
+        if self._file is not None:
+            self.commit()
+            self._file.close()
+            self._file = None
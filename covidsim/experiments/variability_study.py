@@ -22,20 +22,24 @@ from epyc import labnotebook
 
 from covidsim.models import model_events
 from covidsim.datastructures import VariabilityStudyParams
+from covidsim.networks.csr_graph import CSRGraph
 
 from covidsim.experiments.network_variability_study import NetworkVariabilityExperiment
 
 
 class VariabilityExperiment(NetworkVariabilityExperiment):
 
-    def __init__(self, params: VariabilityStudyParams):
+    def __init__(self, params: VariabilityStudyParams, network: CSRGraph = None):
 
-        super(VariabilityExperiment, self).__init__(params)
+        super(VariabilityExperiment, self).__init__(params, network)
 
         self.plugins.register(model_events.SusceptibleInfectionsTracker)
         self.plugins.register(model_events.InfectionsAndInfectedTracker)
 
     def do(self, params):
+        if self.is_ensemble(params):
+            return self._do_ensemble(params)
+
         res = super(VariabilityExperiment, self).do(params, run_simulation=True)
 
         # Gather custom results
@@ -46,6 +50,20 @@ class VariabilityExperiment(NetworkVariabilityExperiment):
 
         return res
 
+    def _do_ensemble(self, params):
+        """Runs ensemble_size replicates together over one network, returning a list of results dicts that the
+        lab notebook stores as separate results."""
+        network_results = super(VariabilityExperiment, self).do(params)
+
+        results = []
+        for (res, metadata) in self.run_ensemble(params):
+            res.update(network_results)
+            res['total_infected'] = res['I'] + res['R']
+            res['total_infected_pct'] = res['total_infected'] / res['population_size']
+            results.append(self.report(params, metadata, res))
+
+        return results
+
     @staticmethod
     def aggregate_results(nb: labnotebook, params: VariabilityStudyParams, series_to_smooth: Dict = {'daily_r': 5}):
         res = super(VariabilityExperiment, VariabilityExperiment).aggregate_results(nb, params, series_to_smooth)
@@ -0,0 +1,53 @@
+"""
+Compiles the intervention parameters of a study into a schedule the models can apply cheaply.
+
+Interventions are given as parameters intervention_1, intervention_2, ... each formatted
+"{day_start}, {day_end}, {effectiveness}".  Rather than parsing these on every infection event, they are compiled
+once per run into a table of the probability that an infection on a given day is cancelled.
+"""
+import numpy as np
+
+from typing import Dict, List
+
+from covidsim.datastructures import Intervention
+
+
+class InterventionSchedule:
+    """Per-day probability that an infection is cancelled by the interventions in force on that day.
+
+    Each intervention independently cancels an infection with its own probability, so where interventions overlap
+    the combined cancellation probability is 1 - (1 - p1)(1 - p2)..."""
+
+    def __init__(self, interventions: List[Intervention]):
+        self.interventions = interventions
+
+        days = max([i.end_day + 1 for i in interventions], default=0)
+        not_cancelled = np.ones(days)
+        for i in interventions:
+            not_cancelled[max(i.start_day, 0):i.end_day + 1] *= 1.0 - i.percent_reduction
+
+        self.cancel_probability = 1.0 - not_cancelled
+
+    @staticmethod
+    def from_params(params: Dict) -> 'InterventionSchedule':
+        """Compiles intervention_1..N from the study parameters, stopping at the first one missing or None."""
+        interventions = []
+        i = 1
+        while 'intervention_' + str(i) in params and params['intervention_' + str(i)] is not None:
+            interventions.append(Intervention.from_string(params['intervention_' + str(i)]))
+            i += 1
+        return InterventionSchedule(interventions)
+
+    def __len__(self):
+        return len(self.cancel_probability)
+
+    def change_days(self) -> List[int]:
+        """Days on which the cancellation probability differs from the day before."""
+        p = np.concatenate([[0.0], self.cancel_probability, [0.0]])
+        return [int(d) for d in np.flatnonzero(np.diff(p))]
+
+    def probability(self, day: int) -> float:
+        """Probability that an infection on the given day is cancelled."""
+        if 0 <= day < len(self.cancel_probability):
+            return self.cancel_probability[day]
+        return 0.0
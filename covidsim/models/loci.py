@@ -0,0 +1,137 @@
+"""
+Custom loci for the epidemic models.
+
+epydemic's loci draw elements uniformly.  The loci here draw elements in proportion to a per-element weight, which
+lets a model fold per-element acceptance probabilities into its event rates instead of rejecting events after the
+fact.
+"""
+import random
+
+from epydemic.compartmentedmodel import CompartmentedEdgeLocus
+
+
+class WeightedElements:
+    """A set of elements, each with a fixed weight, supporting weighted random draws.
+
+    Elements occupy slots in a Fenwick (binary indexed) tree of weights, so adding, discarding and drawing an element
+    are all O(log n).  Slots freed by discarded elements are reused."""
+
+    def __init__(self, weight, uniform=random.random):
+        self._weight = weight
+        self._uniform = uniform
+        self._slots = []
+        self._weights = []
+        self._position = dict()
+        self._free = []
+        self._capacity = 0
+        self._tree = [0.0]
+        self._total = 0.0
+
+    def __len__(self):
+        return len(self._position)
+
+    def __iter__(self):
+        return iter(self._position)
+
+    def __contains__(self, e):
+        return e in self._position
+
+    def total_weight(self) -> float:
+        """Sum of the weights of all the elements in the set."""
+        return self._total if len(self._position) > 0 else 0.0
+
+    def add(self, e):
+        if e in self._position:
+            return
+        w = self._weight(e)
+        if len(self._free) > 0:
+            slot = self._free.pop()
+            self._slots[slot] = e
+            self._weights[slot] = w
+        else:
+            slot = len(self._slots)
+            self._slots.append(e)
+            self._weights.append(w)
+            if slot >= self._capacity:
+                self._rebuild(max(2 * self._capacity, 64))
+                self._position[e] = slot
+                return
+        self._position[e] = slot
+        self._update(slot, w)
+
+    def discard(self, e):
+        slot = self._position.pop(e, None)
+        if slot is None:
+            return
+        w = self._weights[slot]
+        self._slots[slot] = None
+        self._weights[slot] = 0.0
+        self._free.append(slot)
+        self._update(slot, -w)
+
+    def draw(self):
+        """Draws an element with probability proportional to its weight."""
+        if self.total_weight() <= 0.0:
+            raise ValueError('Trying to draw from elements with no weight')
+        while True:
+            target = self._uniform() * self._total
+            pos = 0
+            mask = 1 << (self._capacity.bit_length() - 1)
+            while mask > 0:
+                nxt = pos + mask
+                if nxt <= self._capacity and self._tree[nxt] <= target:
+                    pos = nxt
+                    target -= self._tree[nxt]
+                mask >>= 1
+
+            # Rounding in the running total can very occasionally push the target past the last element
+            if pos < len(self._slots) and self._slots[pos] is not None:
+                return self._slots[pos]
+            self._rebuild(self._capacity)
+
+            # The running total may have been no more than rounding left behind by elements since discarded
+            if self._total <= 0.0:
+                raise ValueError('Trying to draw from elements with no weight')
+
+    def _update(self, slot: int, delta: float):
+        self._total += delta
+        i = slot + 1
+        while i <= self._capacity:
+            self._tree[i] += delta
+            i += i & (-i)
+
+    def _rebuild(self, capacity: int):
+        """Rebuilds the tree from the slot weights, which also clears any accumulated rounding error."""
+        self._capacity = capacity
+        tree = [0.0] * (capacity + 1)
+        tree[1:len(self._weights) + 1] = self._weights
+        for i in range(1, capacity + 1):
+            parent = i + (i & (-i))
+            if parent <= capacity:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._total = sum(self._weights)
+
+
+class WeightedEdgeLocus(CompartmentedEdgeLocus):
+    """An edge locus tracking edges between two compartments, drawing edges in proportion to a weight function of
+    the edge.
+
+    :param name: the locus' name
+    :param l: the left compartment
+    :param r: the right compartment
+    :param weight: function from an (l, r) oriented edge to its weight
+    :param uniform: function returning uniform random numbers in [0, 1) for drawing edges"""
+
+    def __init__(self, name, l, r, weight, uniform=random.random):
+        super(WeightedEdgeLocus, self).__init__(name, l, r)
+        self._elements = WeightedElements(weight, uniform)
+
+    def total_weight(self) -> float:
+        """Sum of the weights of all the edges in the locus."""
+        return self._elements.total_weight()
+
+    def draw(self):
+        if len(self) == 0:
+            raise ValueError('Trying to draw element from empty locus {n}'.format(n=self.name()))
+        return self._elements.draw()
@@ -6,12 +6,24 @@ Event specifications are defined using the pluggy @hookspec decorator.
 Event implementations are contained in classes and defined using the pluggy @hookimp decorator.
 """
 
+import numpy as np
 import pluggy
 import covidsim.models
 
 hookspec = pluggy.HookspecMarker("infectionmodel")
 
 
+@hookspec
+def initialize_results(results, params):
+    """
+    Fires before run starts, once the model has set up its own results
+
+    :param results: Results collection object that the tracking events will be passed
+    :param params: Run parameters
+    :return:
+    """
+
+
 @hookspec
 def track_infection_event(infecting_node, exposed_node, day, results, graph):
     """
@@ -39,6 +51,22 @@ def track_remove_event(removed_node, day, results, graph):
     """
 
 
+@hookspec
+def track_infection_batch(infecting_nodes, exposed_nodes, days, node_state, results, graph):
+    """
+    Fires with the infections of each day as a batch, once the day is over, and with any outstanding infections when
+    the run ends.  Implementing this rather than track_infection_event lets a tracker work on whole arrays of events.
+
+    :param infecting_nodes: Array of the dense ids (see NodeStateStore) of the nodes that spread each infection
+    :param exposed_nodes: Array of the dense ids of the nodes that became infected
+    :param days: Array of the integer day of each infection
+    :param node_state: NodeStateStore holding the per-node state, indexed by the dense ids
+    :param results: Results collection object
+    :param graph: Optional graph for the model
+    :return:
+    """
+
+
 @hookspec
 def finalize_results(initial_results, final_results, params):
     """
@@ -51,52 +79,81 @@ def finalize_results(initial_results, final_results, params):
     """
 
 
-# Built-in trackers
-class InfectionsAndInfectedTracker:
-    """Tracks daily infections and daily currently infected."""
+def has_implementations(hook, name: str) -> bool:
+    """Whether any registered plugin implements the named hook, so that callers can skip building its arguments."""
+    return len(getattr(hook, name).get_hookimpls()) > 0
 
-    @staticmethod
-    @covidsim.models.hookimpl
-    def finalize_results(initial_results, final_results, params):
-        di = initial_results['daily_infections']
-        ci = initial_results['currently_infected']
 
-        if len(di) < params['days_to_run']:
-            di += [0] * (params['days_to_run'] - len(di))
-        if len(di) > params['days_to_run']:
-            di = di[:params['days_to_run']]
+# Tracker base class
+class ArrayTracker:
+    """Base class for trackers that accumulate named per-day numeric columns.
 
-        if len(ci) < params['days_to_run']:
-            ci += [0] * (params['days_to_run'] - len(ci))
-        if len(ci) > params['days_to_run']:
-            ci = ci[:params['days_to_run']]
+    A subclass declares its columns in COLUMNS, mapping each column name to how its values are reduced to one per day:
+    SUM adds the values, COUNT counts the events and MEAN averages the values (0 on days with none).  Each column is
+    held in the results collection as a preallocated array of days_to_run entries (a MEAN column also keeps its counts
+    under the name with COUNT_SUFFIX), and finalize_results reduces them all to daily series.  Columns the model
+    already holds in the results collection are used as they are.
 
-        final_results['daily_infections'] = di
-        final_results['currently_infected'] = ci
+    Event hooks add to the columns with accumulate().  The hooks are classmethods so that, like the other trackers,
+    the subclass itself is registered with the plugin manager."""
 
+    SUM = 'sum'
+    COUNT = 'count'
+    MEAN = 'mean'
 
-class SusceptibleInfectionsTracker:
-    """Tracks how susceptible on average were all individuals who became infected per day."""
+    COUNT_SUFFIX = '_count'
+
+    COLUMNS = dict()
 
-    @staticmethod
+    @classmethod
+    @covidsim.models.hookimpl
+    def initialize_results(cls, results, params):
+        days = params['days_to_run']
+        for (name, reduction) in cls.COLUMNS.items():
+            dtype = np.int64 if reduction == cls.COUNT else float
+            results.setdefault(name, np.zeros(days, dtype=dtype))
+            if reduction == cls.MEAN:
+                results.setdefault(name + cls.COUNT_SUFFIX, np.zeros(days, dtype=np.int64))
+
+    @classmethod
+    def accumulate(cls, results, name: str, days, values=None):
+        """Adds events on the given days to a column.  values holds each event's value, and is not needed for COUNT
+        columns.  Events on days beyond the end of the column are dropped."""
+        column = results[name]
+        days = np.asarray(days)
+        within = days < len(column)
+        days = days[within]
+
+        if cls.COLUMNS[name] != cls.COUNT:
+            column += np.bincount(days, weights=np.asarray(values)[within], minlength=len(column))
+        if cls.COLUMNS[name] != cls.SUM:
+            counts = column if cls.COLUMNS[name] == cls.COUNT else results[name + cls.COUNT_SUFFIX]
+            counts += np.bincount(days, minlength=len(counts))
+
+    @classmethod
     @covidsim.models.hookimpl
-    def track_infection_event(infecting_node, exposed_node, day, results, graph):
-        if 'daily_susceptible_infections' not in results:
-            results['daily_susceptible_infections'] = [[0, 0]] * (day + 1)
+    def finalize_results(cls, initial_results, final_results, params):
+        for (name, reduction) in cls.COLUMNS.items():
+            column = initial_results[name]
+            if reduction == cls.MEAN:
+                counts = initial_results[name + cls.COUNT_SUFFIX]
+                column = np.divide(column, counts, out=np.zeros(len(column)), where=counts > 0)
+            final_results[name] = np.asarray(column).tolist()
 
-        while len(results['daily_susceptible_infections']) < day + 1:
-            results['daily_susceptible_infections'] += [[0, 0]]
 
-        results['daily_susceptible_infections'][day][0] += exposed_node['susceptibility']
-        results['daily_susceptible_infections'][day][1] += 1
+# Built-in trackers
+class InfectionsAndInfectedTracker(ArrayTracker):
+    """Tracks daily infections and daily currently infected.  The model fills in both columns itself."""
+
+    COLUMNS = {'daily_infections': ArrayTracker.SUM, 'currently_infected': ArrayTracker.SUM}
+
+
+class SusceptibleInfectionsTracker(ArrayTracker):
+    """Tracks how susceptible on average were all individuals who became infected per day."""
+
+    COLUMNS = {'daily_susceptible_infections': ArrayTracker.MEAN}
 
-    @staticmethod
+    @classmethod
     @covidsim.models.hookimpl
-    def finalize_results(initial_results, final_results, params):
-        si = initial_results['daily_susceptible_infections']
-        if len(si) < params['days_to_run']:
-            si += [[0, 0]] * (params['days_to_run'] - len(si))
-        if len(si) > params['days_to_run']:
-            si = si[:params['days_to_run']]
-
-        final_results['daily_susceptible_infections'] = [x[0] / x[1] if x[1] > 0 else 0 for x in si]
+    def track_infection_batch(cls, infecting_nodes, exposed_nodes, days, node_state, results, graph):
+        cls.accumulate(results, 'daily_susceptible_infections', days, node_state.susceptibility[exposed_nodes])
@@ -0,0 +1,262 @@
+"""
+Array-backed per-node state for the epidemic models.
+
+The models track a handful of numeric values per node (when it was infected, how many nodes it infected, and so on).
+Storing these as networkx node attributes costs several dict lookups per event, so instead they are kept in
+contiguous NumPy arrays indexed by a dense node id.  Plugins that still expect attribute dicts can use the
+NodeStateView returned by NodeStateStore.view(), which reads and writes through to the arrays.
+"""
+import numpy as np
+
+from collections.abc import MutableMapping
+
+from covidsim.networks.csr_graph import CSRGraph
+
+
+class NodeStateStore:
+    """Per-node model state held in NumPy arrays.  Node n of the network has dense id index[n], and nodes[i] maps a
+    dense id back to the network node.  The network may be a networkx graph or a CSRGraph, whose nodes are already
+    numbered densely.
+
+    Every infection is also appended to an infection log of (infecting, exposed, day) entries, from which the sparse
+    infecting_days of each node is indexed on demand."""
+
+    DAY_INFECTED = 'day_infected'
+    INFECTED = 'infected'
+    INFECTING_DAYS = 'infecting_days'
+    DAYS_INFECTED = 'days_infected'
+    SUSCEPTIBILITY = 'susceptibility'
+
+    ARRAY_KEYS = (DAY_INFECTED, INFECTED, INFECTING_DAYS, DAYS_INFECTED, SUSCEPTIBILITY)
+
+    def __init__(self, g):
+        self.graph = g
+
+        # Sparse: only nodes that have infected others have an entry.  Maps dense id -> {infection number: day}
+        self._infecting_days = {}
+
+        if isinstance(g, CSRGraph):
+            size = g.number_of_nodes()
+            self.nodes = range(size)
+            self.index = _IdentityIndex(size)
+            self._init_arrays(size)
+            self._extra_attributes = {}
+
+            for a in (self.DAY_INFECTED, self.INFECTED, self.DAYS_INFECTED, self.SUSCEPTIBILITY):
+                if a in g.node_attributes:
+                    getattr(self, a)[:] = g.node_attributes[a]
+        else:
+            self.nodes = list(g.nodes)
+            self.index = {n: i for i, n in enumerate(self.nodes)}
+            self._init_arrays(len(self.nodes))
+
+            # Pick up any state the network was initialized with
+            for i, (_, data) in enumerate(g.nodes(data=True)):
+                if self.DAY_INFECTED in data:
+                    self.day_infected[i] = data[self.DAY_INFECTED]
+                if self.INFECTED in data:
+                    self.infected[i] = data[self.INFECTED]
+                if self.DAYS_INFECTED in data:
+                    self.days_infected[i] = data[self.DAYS_INFECTED]
+                if self.SUSCEPTIBILITY in data:
+                    self.susceptibility[i] = data[self.SUSCEPTIBILITY]
+                if self.INFECTING_DAYS in data:
+                    self._infecting_days[i] = dict(data[self.INFECTING_DAYS])
+
+        self.has_susceptibility = bool(np.any(~np.isnan(self.susceptibility)))
+
+        # Running totals so the mean infection length never needs a pass over the population
+        removed = self.days_infected >= 0
+        self.removals = int(np.count_nonzero(removed))
+        self.total_days_infected = int(np.sum(self.days_infected[removed]))
+
+        self.log_infecting = []
+        self.log_exposed = []
+        self.log_day = []
+        self._initial_infected = self.infected.copy()
+        self._logged_counts = {}
+        self._indexed = 0
+
+    def _init_arrays(self, size: int):
+        self.day_infected = np.zeros(size, dtype=np.int32)
+        self.infected = np.zeros(size, dtype=np.int32)
+        self.days_infected = np.full(size, -1, dtype=np.int32)
+        self.susceptibility = np.full(size, np.nan)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def record_infection(self, infecting: int, exposed: int, day: int):
+        """Records that the node with dense id infecting infected the node with dense id exposed on the given day."""
+        self.infected[infecting] += 1
+        self.day_infected[exposed] = day
+        self.log_infecting.append(infecting)
+        self.log_exposed.append(exposed)
+        self.log_day.append(day)
+
+    def record_infections(self, infecting: np.ndarray, exposed: np.ndarray, day: int):
+        """Vectorized record_infection for a batch of infections on the same day."""
+        np.add.at(self.infected, infecting, 1)
+        self.day_infected[exposed] = day
+        self.log_infecting.extend(infecting.tolist())
+        self.log_exposed.extend(exposed.tolist())
+        self.log_day.extend([day] * len(exposed))
+
+    def infection_log(self, start: int = 0):
+        """The infection log from entry start onwards, as (infecting, exposed, day) arrays."""
+        return (np.array(self.log_infecting[start:], dtype=np.int64),
+                np.array(self.log_exposed[start:], dtype=np.int64),
+                np.array(self.log_day[start:], dtype=np.int64))
+
+    def record_removal(self, removed: int, day: int) -> int:
+        """Records the removal of a node on the given day and returns the number of days it was infected."""
+        days = int(day - self.day_infected[removed])
+        self.days_infected[removed] = days
+        self.removals += 1
+        self.total_days_infected += days
+        return days
+
+    def record_removals(self, removed: np.ndarray, day: int):
+        """Vectorized record_removal for a batch of removals on the same day."""
+        days = day - self.day_infected[removed]
+        self.days_infected[removed] = days
+        self.removals += len(removed)
+        self.total_days_infected += int(np.sum(days))
+
+    def infecting_days(self, i: int):
+        """The {infection number: day} record of the infections caused by the node with dense id i, or None."""
+        self._index_log()
+        return self._infecting_days.get(i)
+
+    def set_infecting_days(self, i: int, days):
+        self._index_log()
+        if days is None:
+            self._infecting_days.pop(i, None)
+        else:
+            self._infecting_days[i] = days
+
+    def attributes(self, n):
+        """The attribute dict of network node n, for keys not held in arrays."""
+        if isinstance(self.graph, CSRGraph):
+            return self._extra_attributes.setdefault(n, {})
+        return self.graph.nodes[n]
+
+    def _index_log(self):
+        """Brings infecting_days up to date with the infection log."""
+        for k in range(self._indexed, len(self.log_day)):
+            j = self.log_infecting[k]
+            count = self._logged_counts.get(j, int(self._initial_infected[j])) + 1
+            self._logged_counts[j] = count
+            self._infecting_days.setdefault(j, {})[count] = self.log_day[k]
+        self._indexed = len(self.log_day)
+
+    def set_days_infected(self, i: int, days: int):
+        """Overwrites the days_infected of a node, keeping the running totals consistent.  -1 clears it."""
+        old = int(self.days_infected[i])
+        if old >= 0:
+            self.removals -= 1
+            self.total_days_infected -= old
+        if days >= 0:
+            self.removals += 1
+            self.total_days_infected += int(days)
+        self.days_infected[i] = days
+
+    def mean_infection_length(self) -> float:
+        """Average number of days infected over all nodes that have been removed."""
+        if self.removals == 0:
+            return np.nan
+        return self.total_days_infected / self.removals
+
+    def view(self, n) -> 'NodeStateView':
+        """Returns a dict-like view of the state of network node n."""
+        return NodeStateView(self, self.index[n], n)
+
+
+class NodeStateView(MutableMapping):
+    """Dict-like view of one node's state, for plugins written against networkx node attribute dicts.
+    Keys held by the NodeStateStore read and write through to its arrays; any other key falls through to the node's
+    attribute dict in the network."""
+
+    def __init__(self, store: NodeStateStore, i: int, n):
+        self._store = store
+        self._i = i
+        self._n = n
+
+    def _attributes(self):
+        return self._store.attributes(self._n)
+
+    def _has(self, key) -> bool:
+        s = self._store
+        if key == s.DAYS_INFECTED:
+            return s.days_infected[self._i] >= 0
+        if key == s.SUSCEPTIBILITY:
+            return not np.isnan(s.susceptibility[self._i])
+        if key == s.INFECTING_DAYS:
+            return s.infecting_days(self._i) is not None
+        return True
+
+    def __getitem__(self, key):
+        s = self._store
+        if key not in s.ARRAY_KEYS:
+            return self._attributes()[key]
+        if not self._has(key):
+            raise KeyError(key)
+        if key == s.INFECTING_DAYS:
+            return s.infecting_days(self._i)
+        return getattr(s, key)[self._i].item()
+
+    def __setitem__(self, key, value):
+        s = self._store
+        if key not in s.ARRAY_KEYS:
+            self._attributes()[key] = value
+        elif key == s.INFECTING_DAYS:
+            s.set_infecting_days(self._i, value)
+        elif key == s.DAYS_INFECTED:
+            s.set_days_infected(self._i, value)
+        else:
+            getattr(s, key)[self._i] = value
+
+    def __delitem__(self, key):
+        s = self._store
+        if key not in s.ARRAY_KEYS:
+            del self._attributes()[key]
+        elif not self._has(key):
+            raise KeyError(key)
+        elif key == s.INFECTING_DAYS:
+            s.set_infecting_days(self._i, None)
+        elif key == s.DAYS_INFECTED:
+            s.set_days_infected(self._i, -1)
+        elif key == s.SUSCEPTIBILITY:
+            s.susceptibility[self._i] = np.nan
+        else:
+            getattr(s, key)[self._i] = 0
+
+    def __iter__(self):
+        s = self._store
+        for key in s.ARRAY_KEYS:
+            if self._has(key):
+                yield key
+        for key in self._attributes():
+            if key not in s.ARRAY_KEYS:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class _IdentityIndex:
+    """Index for networks whose nodes are already numbered 0..n-1."""
+
+    def __init__(self, size: int):
+        self._size = size
+
+    def __getitem__(self, n) -> int:
+        if not 0 <= n < self._size:
+            raise KeyError(n)
+        return int(n)
+
+    def __contains__(self, n) -> bool:
+        return 0 <= n < self._size
+
+    def __len__(self):
+        return self._size
@@ -5,11 +5,18 @@ This model operates on a provided network.  Various standard daily data points a
 
 The model can be customized by the use of parameters, and also the application of various plugins.
 """
-import random
 import numpy as np
 
+from bisect import bisect_right
+
 from epydemic import *
 
+from covidsim.models import model_events
+from covidsim.models.interventions import InterventionSchedule
+from covidsim.models.loci import WeightedEdgeLocus
+from covidsim.models.node_state import NodeStateStore
+from covidsim.utils.random_streams import RandomStream
+
 
 class TrackedSIR(CompartmentedModel):
     SUSCEPTIBLE = 'S'
@@ -22,128 +29,180 @@ class TrackedSIR(CompartmentedModel):
 
     SI = 'SI'
 
+    REJECTION_FREE = 'rejection_free'
+
     def __init__(self, hook):
         super(TrackedSIR, self).__init__()
         self.timeseries_results = dict()
-        self.interventions = dict()
+        self.interventions = None
         self.params = None
+        self.node_state = None
+        self.compartment_counts = dict()
+        self.rejection_free = False
         self.hook = hook
+        self.random = RandomStream(np.random.default_rng())
+        self._p_infect = None
+        self._rate_change_times = []
+        self._last_day = -1
+        self._track_infections = True
+        self._track_removals = True
+        self._track_batches = True
+        self._batched = 0
 
     # Overriden methods
     def build(self, params):
         """Executes once before the simulation starts.  Initializes compartments and reporting variables."""
         self.params = params
+        self.node_state = NodeStateStore(self._g)
+        self.interventions = InterventionSchedule.from_params(params)
 
-        self.timeseries_results['daily_infections'] = []
-        self.timeseries_results['currently_infected'] = []
+        # Fixed-length daily buffers; events after days_to_run are beyond the horizon and not recorded in them
+        self.timeseries_results['daily_infections'] = np.zeros(params['days_to_run'], dtype=np.int64)
+        self.timeseries_results['currently_infected'] = np.zeros(params['days_to_run'], dtype=np.int64)
+        self._last_day = -1
+
+        # Only dispatch the events some plugin is listening for
+        self._track_infections = model_events.has_implementations(self.hook, 'track_infection_event')
+        self._track_removals = model_events.has_implementations(self.hook, 'track_remove_event')
+        self._track_batches = model_events.has_implementations(self.hook, 'track_infection_batch')
+        self._batched = 0
+        self.hook.initialize_results(results=self.timeseries_results, params=params)
 
         self.addCompartment(self.INFECTED, params['pInfected'])
         self.addCompartment(self.REMOVED, 0.0)
         self.addCompartment(self.SUSCEPTIBLE, 1 - params['pInfected'])
+        self.compartment_counts = {c: 0 for c in self.compartments()}
 
         self.trackNodesInCompartment(self.INFECTED)
-        self.trackEdgesBetweenCompartments(self.SUSCEPTIBLE, self.INFECTED, name=self.SI)
+
+        # In rejection-free mode each SI edge is weighted by the chance that an infection along it succeeds, rather
+        # than firing at the full rate and discarding the events that fail.
+        self.rejection_free = 'dynamics' in params and params['dynamics'] == self.REJECTION_FREE
+        self._rate_change_times = []
+        if self.rejection_free:
+            s = self.node_state.susceptibility
+            weights = np.where(np.isnan(s), 1.0, np.clip(s, 0.0, 1.0)).tolist()
+            index = self.node_state.index
+            self.addLocus(self.SI, WeightedEdgeLocus(self.SI, self.SUSCEPTIBLE, self.INFECTED,
+                                                     lambda e: weights[index[e[0]]], self.random.random))
+            self._rate_change_times = self._day_start_times(self.interventions.change_days())
+        else:
+            self.trackEdgesBetweenCompartments(self.SUSCEPTIBLE, self.INFECTED, name=self.SI)
 
         if 'always_infect' in params and params['always_infect']:
-            self.addEventPerElement(self.SI, 1.0, self.infect)
+            self._p_infect = 1.0
         else:
-            self.addEventPerElement(self.SI, params['pInfect'], self.infect)
+            self._p_infect = params['pInfect']
+        self.addEventPerElement(self.SI, self._p_infect, self.infect)
 
         self.addEventPerElement(self.INFECTED, params['pRemove'], self.remove)
 
     def infect(self, t, e):
         """Infect event.  May be cancelled by an intervention at a certain probability."""
         (n, m) = e
-        infecting_node = self._g.nodes[m]
-        exposed_node = self._g.nodes[n]
+        state = self.node_state
+        exposed = state.index[n]
         day = int(t * self.params['time_scale'])
 
-        # Apply effects of interventions
-        if self._intervention_cancels_infection(day, e):
-            return
+        if not self.rejection_free:
+            # Apply effects of interventions
+            if self._intervention_cancels_infection(day, e):
+                return
 
-        # Use individual susceptibility if applicable
-        if 'susceptibility' in exposed_node and random.random() > exposed_node['susceptibility']:
-            return
+            # Use individual susceptibility if applicable
+            if state.has_susceptibility and self.random.random() > state.susceptibility[exposed]:
+                return
 
-        # increment various infection counters
-        if 'day_infected' not in infecting_node:
-            infecting_node['day_infected'] = 0
-
-        if 'infecting_days' not in infecting_node:
-            infecting_node['infected'] = 0
-            infecting_node['infecting_days'] = {}
-        infecting_node['infected'] += 1
-        infecting_node['infecting_days'][infecting_node['infected']] = day
+        self._start_day(day)
 
-        exposed_node['day_infected'] = day
+        # increment various infection counters
+        state.record_infection(state.index[m], exposed, day)
 
         di = self.timeseries_results['daily_infections']
-        ci = self.timeseries_results['currently_infected']
-
-        while len(di) - 1 < day:
-            di.append(0)
-        di[day] += 1
-
-        if len(ci) == 0:
-            num_infected = len(
-                [self._g.nodes[x] for x in self._g.nodes if self._g.nodes[x]['compartment'] == self.INFECTED])
-            ci.append(num_infected)
-
-        while len(ci) - 1 < day:
-            ci.append(ci[-1])
-        ci[day] += 1
+        if day < len(di):
+            di[day] += 1
 
         # Finally, do the actual compartment change
         self.changeCompartment(n, self.INFECTED)
         self.markOccupied(e, t)
+        self._record_currently_infected(day)
 
-        self.hook.track_infection_event(infecting_node=infecting_node, exposed_node=exposed_node, day=day,
-                                        results=self.timeseries_results, graph=self._g)
+        if self._track_infections:
+            self.hook.track_infection_event(infecting_node=state.view(m), exposed_node=state.view(n), day=day,
+                                            results=self.timeseries_results, graph=self._g)
 
     def remove(self, t, n):
         """Remove event"""
         day = int(t * self.params['time_scale'])
+        self._start_day(day)
 
         # Record days_infected and decrement currently infected counter
-        node = self._g.nodes[n]
-        node['days_infected'] = day - node['day_infected']
-
-        ci = self.timeseries_results['currently_infected']
-        if len(ci) == 0:
-            num_infected = len(
-                [self._g.nodes[x] for x in self._g.nodes if self._g.nodes[x]['compartment'] == self.INFECTED])
-            ci.append(num_infected)
-
-        while len(ci) - 1 < day:
-            ci.append(ci[-1])
-
-        ci[day] -= 1
+        self.node_state.record_removal(self.node_state.index[n], day)
 
         # Do actual compartment change
         self.changeCompartment(n, self.REMOVED)
+        self._record_currently_infected(day)
 
-        self.hook.track_remove_event(removed_node=node, day=day, results=self.timeseries_results, graph=self._g)
+        if self._track_removals:
+            self.hook.track_remove_event(removed_node=self.node_state.view(n), day=day,
+                                         results=self.timeseries_results, graph=self._g)
 
     def results(self):
         """Collects and returns results after the simulation has ended."""
-        res = super(TrackedSIR, self).results()
+        # Compartment sizes come from the running counters rather than a scan of every node
+        res = super(CompartmentedModel, self).results()
+        res.update(self.compartment_counts)
 
+        self._dispatch_infection_batch()
         self.hook.finalize_results(initial_results=self.timeseries_results, final_results=res, params=self.params)
 
-        # TODO: Fix this dependency issue
-        di = res['daily_infections']
-        ci = res['currently_infected']
-
         # Calculate the average length of an infection
-        n = self._g.nodes
-        mil = np.mean([n[x]['days_infected'] for x in n if 'days_infected' in n[x]])
+        mil = self.node_state.mean_infection_length()
         res['mean_infection_length'] = mil
 
-        res['daily_r'] = [((di[x + 1] / ci[x]) if ci[x] != 0 else 0) * mil for x in range(len(ci) - 1)]
+        res['daily_r'] = self.daily_r(self.timeseries_results['daily_infections'],
+                                      self.timeseries_results['currently_infected'], mil)
 
         return res
 
+    def eventRateDistribution(self, t):
+        """In rejection-free mode the SI rate is the total weight of the SI edges, scaled by the chance that the
+        interventions in force let an infection through."""
+        rates = super(TrackedSIR, self).eventRateDistribution(t)
+        if self.rejection_free:
+            si = self.locus(self.SI)
+            scale = 1.0 - self.interventions.probability(int(t * self.params['time_scale']))
+            rates = [(l, (self._p_infect * l.total_weight() * scale) if l is si else r, ef) for (l, r, ef) in rates]
+        return rates
+
+    def nextRateChange(self, t):
+        """Returns the next time after t at which an intervention starts or ends, if the rates depend on it."""
+        i = bisect_right(self._rate_change_times, t)
+        return self._rate_change_times[i] if i < len(self._rate_change_times) else None
+
+    def setCompartment(self, n, c):
+        """Sets the initial compartment of a node, keeping the compartment counters up to date."""
+        super(TrackedSIR, self).setCompartment(n, c)
+        self.compartment_counts[c] += 1
+
+    def changeCompartment(self, n, c):
+        """Moves a node between compartments, keeping the compartment counters up to date."""
+        oc = self._g.nodes[n][self.COMPARTMENT]
+        super(TrackedSIR, self).changeCompartment(n, c)
+        if oc is not None:
+            self.compartment_counts[oc] -= 1
+        self.compartment_counts[c] += 1
+
+    @staticmethod
+    def daily_r(di, ci, mil):
+        """Estimates R for each day from the next day's infections per currently infected node."""
+        di = np.asarray(di, dtype=float)
+        ci = np.asarray(ci, dtype=float)
+        if len(ci) < 2:
+            return []
+        r = np.divide(di[1:len(ci)], ci[:-1], out=np.zeros(len(ci) - 1), where=ci[:-1] != 0)
+        return (r * mil).tolist()
+
     def reset(self):
         """Runs after a single simulation, prepares for the next simulation."""
         super(TrackedSIR, self).reset()
@@ -151,15 +210,41 @@ class TrackedSIR(CompartmentedModel):
 
     # --Private methods--
 
-    def _intervention_cancels_infection(self, day, e):
-        """Cancels an intervention at a certain specified probability based on the intervention parameters."""
-        (n, m) = e
+    def _start_day(self, day):
+        """Before the first event of a day, passes the infections so far to the batch trackers and fills any days
+        since the last event with the number then infected."""
+        if day > self._last_day:
+            self._dispatch_infection_batch()
+            ci = self.timeseries_results['currently_infected']
+            ci[self._last_day + 1:min(day, len(ci))] = self.compartment_counts[self.INFECTED]
+            self._last_day = day
 
-        i = 1
-        while 'intervention_' + str(i) in self.params and self.params['intervention_' + str(i)] is not None:
-            intervention = self.params['intervention_' + str(i)].split(',')
-            if int(intervention[0]) <= day <= int(intervention[1]):
-                if random.random() < float(intervention[2]):
-                    return True
-            i += 1
-        return False
+    def _record_currently_infected(self, day):
+        ci = self.timeseries_results['currently_infected']
+        if day < len(ci):
+            ci[day] = self.compartment_counts[self.INFECTED]
+
+    def _dispatch_infection_batch(self):
+        """Passes the infections logged since the last batch to the batch trackers."""
+        state = self.node_state
+        if self._track_batches and len(state.log_day) > self._batched:
+            infecting, exposed, days = state.infection_log(self._batched)
+            self.hook.track_infection_batch(infecting_nodes=infecting, exposed_nodes=exposed, days=days,
+                                            node_state=state, results=self.timeseries_results, graph=self._g)
+        self._batched = len(state.log_day)
+
+    def _day_start_times(self, days):
+        """Converts days to the earliest model times that fall on those days."""
+        time_scale = self.params['time_scale']
+        times = []
+        for day in days:
+            t = day / time_scale
+            while int(t * time_scale) < day:
+                t = float(np.nextafter(t, np.inf))
+            times.append(t)
+        return times
+
+    def _intervention_cancels_infection(self, day, e):
+        """Cancels an infection at the probability given by the interventions in force on that day."""
+        p = self.interventions.probability(day)
+        return p > 0.0 and self.random.random() < p
@@ -0,0 +1,119 @@
+"""
+Configuration-model networks built directly as CSR arrays.
+
+The configuration model pairs up node "stubs" at random, so that each node ends up with the degree it was given.
+Building it through networkx takes several passes over dict-of-dict structures (pairing, collapsing multi-edges,
+finding the giant component, copying it and removing self-loops), which is slow and memory-hungry for large
+populations.  Here every step works on NumPy edge arrays instead, and the result is a CSRGraph of the giant component.
+"""
+import numpy as np
+
+from covidsim.networks.csr_graph import CSRGraph
+
+
+def configuration_model_csr(degrees, rng: np.random.Generator = None) -> CSRGraph:
+    """Builds the giant component of a configuration-model network with the given node degrees, with self-loops and
+    multi-edges removed, as networkx's configuration_model followed by giant component extraction would.  The degree
+    sum must be even.  Nodes are renumbered 0..n-1 in the order of the original node numbers.
+
+    :param degrees: the degree of each node
+    :param rng: numpy Generator to draw from (defaults to a fresh one)
+    :returns: the giant component"""
+    if rng is None:
+        rng = np.random.default_rng()
+    degrees = np.asarray(degrees, dtype=np.int64)
+    if np.sum(degrees) % 2 != 0:
+        raise ValueError('The degree sequence must have an even sum')
+    n = len(degrees)
+
+    # Pair the stubs at random
+    stubs = np.repeat(np.arange(n, dtype=np.int64), degrees)
+    rng.shuffle(stubs)
+    u, v = stubs[0::2], stubs[1::2]
+
+    # Drop self-loops, and collapse multi-edges by keeping each (low, high) pair once
+    keep = u != v
+    low, high = np.minimum(u[keep], v[keep]), np.maximum(u[keep], v[keep])
+    pairs = np.sort(low * n + high)
+    first = np.ones(len(pairs), dtype=bool)
+    first[1:] = pairs[1:] != pairs[:-1]
+    pairs = pairs[first]
+    u, v = pairs // n, pairs % n
+
+    # Keep the giant component, renumbering its nodes densely
+    label = connected_component_labels(n, u, v)
+    giant = label == np.argmax(np.bincount(label))
+    renumber = np.cumsum(giant) - 1
+    in_giant = giant[u]
+    return csr_from_edges(int(np.count_nonzero(giant)), renumber[u[in_giant]], renumber[v[in_giant]])
+
+
+def connected_component_labels(n: int, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """Labels the nodes 0..n-1 of the undirected graph with edges (u[i], v[i]) by connected component, each component
+    taking the label of its lowest-numbered node.
+
+    Works as a union-find over all the edges at once: each round joins the two roots of every edge whose ends are
+    still in different sets, lower root winning, and then compresses every path to its root."""
+    label = np.arange(n, dtype=np.int64)
+    while True:
+        lu, lv = label[u], label[v]
+        differ = lu != lv
+        if not np.any(differ):
+            return label
+        lu, lv = lu[differ], lv[differ]
+        np.minimum.at(label, np.maximum(lu, lv), np.minimum(lu, lv))
+
+        while True:
+            compressed = label[label]
+            if np.array_equal(compressed, label):
+                break
+            label = compressed
+
+
+def csr_from_edges(n: int, u: np.ndarray, v: np.ndarray, layers: np.ndarray = None) -> CSRGraph:
+    """Builds a CSRGraph over nodes 0..n-1 from undirected edges (u[i], v[i]), each given once, optionally in the
+    given layers."""
+    src = np.concatenate([u, v]).astype(np.int64)
+    dst = np.concatenate([v, u])
+    order = np.argsort(src * n + dst)
+
+    offsets = np.zeros(n + 1, dtype=CSRGraph.offsets_dtype(len(src)))
+    np.cumsum(np.bincount(src, minlength=n), out=offsets[1:])
+    edge_layers = np.concatenate([layers, layers])[order].astype(np.uint8) if layers is not None else None
+    return CSRGraph(offsets, dst[order].astype(np.int32), edge_layers=edge_layers)
+
+
+def giant_component_mask(degrees, rng: np.random.Generator = None) -> np.ndarray:
+    """Approximates which nodes of a configuration-model network with the given degrees fall in its giant component,
+    without wiring the network.
+
+    Following Newman, Strogatz and Watts, "Random graphs with arbitrary degree distributions" (2001), a node of degree
+    k lies outside the giant component with probability u^k, where u is the smallest fixed point in [0, 1] of
+    G1(u) = sum_k k p_k u^(k - 1) / <k>.  Membership is drawn independently for each node.  A node in the giant
+    component keeps all its neighbours, so keeps its degree, up to the self-loops and multi-edges that
+    configuration_model_csr drops.  If there is no giant component (by the Molloy-Reed criterion, u = 1), the
+    approximation does not apply and every node is kept.
+
+    :param degrees: the degree of each node
+    :param rng: numpy Generator to draw from (defaults to a fresh one)
+    :returns: a boolean array, True for the nodes in the giant component"""
+    if rng is None:
+        rng = np.random.default_rng()
+    degrees = np.asarray(degrees, dtype=np.int64)
+
+    # Excess degree distribution of the ends of edges, as coefficients of G1
+    k = np.arange(1, np.max(degrees) + 1)
+    q = k * np.bincount(degrees, minlength=len(k) + 1)[1:]
+    q = q / np.sum(q)
+
+    # Iterating from 0 climbs monotonically to the smallest fixed point
+    u = 0.0
+    for _ in range(10000):
+        next_u = float(np.dot(q, u ** (k - 1)))
+        if abs(next_u - u) < 1e-12:
+            break
+        u = next_u
+
+    if u > 1.0 - 1e-9:
+        return np.ones(len(degrees), dtype=bool)
+    return rng.random(len(degrees)) >= u ** degrees
@@ -0,0 +1,110 @@
+"""
+Compact array representation of a population network.
+
+An undirected graph is held in compressed sparse row (CSR) form: the neighbours of node i are
+neighbours[offsets[i]:offsets[i + 1]], and every edge appears once in each direction.  Nodes are numbered 0..n-1.
+Per-node attributes (such as susceptibility) are held as arrays in node_attributes, and edges may be tagged with the
+layer of contact they belong to (household, work and so on) in edge_layers, alongside neighbours.
+
+The arrays are kept compact, so that populations of tens of millions fit in memory: node numbers are int32, offsets
+are int32 unless there are too many edges for that, and layers are uint8.  That comes to 4 bytes per node and 8 bytes
+per edge (10 with layers), against hundreds of bytes per edge in a networkx graph.
+"""
+import networkx as nx
+import numpy as np
+
+from typing import Dict
+
+
+class CSRGraph:
+    """Undirected graph in compressed sparse row form."""
+
+    LAYER = 'layer'  #: Edge attribute holding the layer of an edge in networkx graphs.
+
+    def __init__(self, offsets: np.ndarray, neighbours: np.ndarray, node_attributes: Dict[str, np.ndarray] = None,
+                 edge_layers: np.ndarray = None):
+        self.offsets = offsets
+        self.neighbours = neighbours
+        self.node_attributes = node_attributes if node_attributes is not None else dict()
+        self.edge_layers = edge_layers
+
+    @staticmethod
+    def offsets_dtype(entries: int) -> np.dtype:
+        """The smallest of int32 and int64 that holds offsets into neighbours arrays of the given length."""
+        return np.dtype(np.int32) if entries <= np.iinfo(np.int32).max else np.dtype(np.int64)
+
+    @staticmethod
+    def from_networkx(g, attributes=('susceptibility', 'day_infected')) -> 'CSRGraph':
+        """Converts a networkx graph.  Nodes are renumbered 0..n-1 in the graph's node order, and any of the named
+        node attributes that every node has are copied into arrays, as are edge layers if every edge has one."""
+        nodes = list(g.nodes)
+        index = {n: i for i, n in enumerate(nodes)}
+
+        degrees = np.fromiter((d for (_, d) in g.degree(nodes)), dtype=np.int64, count=len(nodes))
+        offsets = np.zeros(len(nodes) + 1, dtype=CSRGraph.offsets_dtype(int(np.sum(degrees))))
+        np.cumsum(degrees, out=offsets[1:])
+
+        neighbours = np.fromiter((index[m] for n in nodes for m in g.adj[n]), dtype=np.int32, count=offsets[-1])
+
+        node_attributes = dict()
+        for a in attributes:
+            values = [data.get(a) for (_, data) in g.nodes(data=True)]
+            if len(values) > 0 and all(v is not None for v in values):
+                node_attributes[a] = np.array(values)
+
+        edge_layers = None
+        if g.number_of_edges() > 0 and CSRGraph.LAYER in next(iter(g.edges(data=True)))[2]:
+            layers = [data.get(CSRGraph.LAYER) for n in nodes for data in g.adj[n].values()]
+            if all(l is not None for l in layers):
+                edge_layers = np.array(layers, dtype=np.uint8)
+
+        return CSRGraph(offsets, neighbours, node_attributes, edge_layers)
+
+    def to_networkx(self) -> nx.Graph:
+        """Converts to a networkx graph with nodes 0..n-1, carrying the node attributes and edge layers."""
+        n = self.number_of_nodes()
+        src = np.repeat(np.arange(n), self.degrees())
+        once = src < self.neighbours
+
+        g = nx.Graph()
+        g.add_nodes_from(range(n))
+        if self.edge_layers is None:
+            g.add_edges_from(zip(src[once].tolist(), self.neighbours[once].tolist()))
+        else:
+            g.add_edges_from((u, v, {self.LAYER: l}) for (u, v, l) in zip(src[once].tolist(),
+                                                                              self.neighbours[once].tolist(),
+                                                                              self.edge_layers[once].tolist()))
+        for (a, values) in self.node_attributes.items():
+            nx.set_node_attributes(g, dict(enumerate(values.tolist())), a)
+        return g
+
+    def nbytes(self) -> int:
+        """Memory taken by the graph's arrays."""
+        arrays = [self.offsets, self.neighbours] + list(self.node_attributes.values())
+        if self.edge_layers is not None:
+            arrays.append(self.edge_layers)
+        return sum(a.nbytes for a in arrays)
+
+    def number_of_nodes(self) -> int:
+        return len(self.offsets) - 1
+
+    def number_of_edges(self) -> int:
+        return len(self.neighbours) // 2
+
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def edges_from(self, nodes: np.ndarray):
+        """Returns every edge leaving the given nodes as two arrays: the position in nodes of the edge's origin,
+        and the neighbour it leads to."""
+        starts = self.offsets[nodes]
+        counts = self.offsets[nodes + 1] - starts
+        total = int(np.sum(counts))
+        if total == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=self.neighbours.dtype)
+
+        # Index of every neighbour entry, built without a Python loop over the nodes
+        ends = np.cumsum(counts)
+        positions = np.arange(total) - np.repeat(ends - counts, counts) + np.repeat(starts, counts)
+
+        return np.repeat(np.arange(len(nodes)), counts), self.neighbours[positions]
@@ -0,0 +1,46 @@
+"""
+Sparse Erdos-Renyi G(n, p) networks built directly as CSR arrays.
+
+networkx's erdos_renyi_graph tests every one of the n(n - 1) / 2 pairs of nodes.  Following Batagelj and Brandes,
+"Efficient generation of large random networks" (2005), this generator instead numbers the pairs and jumps from one
+edge to the next by geometrically distributed skips, so the work is proportional to the number of edges.  The skips
+are drawn in bulk, and the edges are written straight into a CSRGraph.
+"""
+import math
+import numpy as np
+
+from covidsim.networks.configuration_model import csr_from_edges
+from covidsim.networks.csr_graph import CSRGraph
+
+
+def erdos_renyi_csr(n: int, p: float, rng: np.random.Generator = None) -> CSRGraph:
+    """Builds a G(n, p) random network, each pair of the nodes 0..n-1 being joined independently with probability p.
+
+    :param n: number of nodes
+    :param p: probability of an edge between each pair of nodes
+    :param rng: numpy Generator to draw from (defaults to a fresh one)
+    :returns: the network"""
+    if rng is None:
+        rng = np.random.default_rng()
+    pairs = n * (n - 1) // 2
+    if p <= 0.0 or pairs == 0:
+        return csr_from_edges(n, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+    # The 0-based numbers of the chosen pairs, in increasing order: the gaps between them are geometric
+    chosen = []
+    last = -1
+    chunk = int(pairs * p + 4 * math.sqrt(pairs * p) + 16)
+    while last < pairs:
+        positions = last + np.cumsum(rng.geometric(min(p, 1.0), size=chunk))
+        chosen.append(positions[positions < pairs])
+        last = int(positions[-1])
+        chunk = max(16, chunk // 4)
+    index = np.concatenate(chosen)
+
+    # Pair number i is the pair (v, w) with w < v and i = v(v - 1) / 2 + w
+    v = np.floor((1.0 + np.sqrt(1.0 + 8.0 * index)) / 2.0).astype(np.int64)
+    v -= v * (v - 1) // 2 > index
+    v += (v + 1) * v // 2 <= index
+    w = index - v * (v - 1) // 2
+
+    return csr_from_edges(n, v, w)
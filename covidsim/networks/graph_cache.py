@@ -0,0 +1,87 @@
+"""
+On-disk cache of generated networks.
+
+Generating a large network takes far longer than loading one, and sweeps often rebuild the same networks: every
+experiment (and every worker process) builds its prototype network, and sweep points that only vary epidemic or
+susceptibility parameters can reuse a pool of networks.  GraphCache stores each network's CSR arrays in a directory
+named by a hash of the parameters that generated it, as uncompressed .npy files.  Loading memory-maps the arrays, so
+it is near-instant, and processes loading the same network share its pages.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from covidsim.networks.csr_graph import CSRGraph
+
+
+class GraphCache:
+    """A directory of generated networks, keyed by the parameters that generated them.
+
+    :param directory: the cache directory, created if needed"""
+
+    OFFSETS = 'offsets.npy'
+    NEIGHBOURS = 'neighbours.npy'
+    EDGE_LAYERS = 'edge_layers.npy'
+    PARAMETERS = 'parameters.json'
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(network_type: str, population: int, param1: float, param2: float, maxdeg: int, seed) -> dict:
+        """The parameters identifying a network, normalized so that equal values give equal keys.  seed is anything
+        JSON can represent, typically the root seed and the network's index."""
+        return {'network_type': network_type,
+                'population': int(population),
+                'network_param_1': float(param1),
+                'network_param_2': float(param2),
+                'maxdeg': int(maxdeg),
+                'seed': seed}
+
+    def path(self, key: dict) -> str:
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest)
+
+    def __contains__(self, key: dict) -> bool:
+        return os.path.isdir(self.path(key))
+
+    def load(self, key: dict) -> CSRGraph:
+        """Memory-maps a cached network, or returns None if it is not in the cache."""
+        path = self.path(key)
+        if not os.path.isdir(path):
+            return None
+        layers = os.path.join(path, self.EDGE_LAYERS)
+        return CSRGraph(np.load(os.path.join(path, self.OFFSETS), mmap_mode='r'),
+                        np.load(os.path.join(path, self.NEIGHBOURS), mmap_mode='r'),
+                        edge_layers=np.load(layers, mmap_mode='r') if os.path.exists(layers) else None)
+
+    def save(self, key: dict, g: CSRGraph):
+        """Adds a network to the cache.  The entry is written to one side and renamed into place, so concurrent
+        processes never see a partial entry; if another process got there first, its entry is kept."""
+        path = self.path(key)
+        staging = tempfile.mkdtemp(dir=self.directory, prefix='.staging-')
+        try:
+            np.save(os.path.join(staging, self.OFFSETS), np.ascontiguousarray(g.offsets))
+            np.save(os.path.join(staging, self.NEIGHBOURS), np.ascontiguousarray(g.neighbours))
+            if g.edge_layers is not None:
+                np.save(os.path.join(staging, self.EDGE_LAYERS), np.ascontiguousarray(g.edge_layers))
+            with open(os.path.join(staging, self.PARAMETERS), 'w') as f:
+                json.dump(key, f, sort_keys=True)
+            os.rename(staging, path)
+        except OSError:
+            if not os.path.isdir(path):
+                raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def get(self, key: dict, build) -> CSRGraph:
+        """Returns the cached network for key, first building it with build() and caching it if need be."""
+        g = self.load(key)
+        if g is None:
+            self.save(key, build())
+            g = self.load(key)
+        return g
@@ -0,0 +1,45 @@
+"""
+Summary statistics of a population network and the susceptibilities of its nodes.
+
+The statistics are computed from arrays of node degrees and susceptibilities (as held by a CSRGraph), so each is a
+handful of vectorized operations rather than a pass over the networkx node dicts.
+"""
+import numpy as np
+
+from typing import Dict
+
+
+def exposure_susceptibility(susceptibility: np.ndarray, degrees: np.ndarray) -> np.ndarray:
+    """The probability 1 - (1 - s)^k that a node of susceptibility s is infected by at least one of its k neighbours,
+    were they all infected.  Computed as -expm1(k log1p(-s)), which keeps its precision when s is small; gamma
+    susceptibilities can exceed 1, where the logarithm is undefined, and those fall back to the power."""
+    s = np.asarray(susceptibility, dtype=float)
+    k = np.asarray(degrees)
+
+    exposure = np.empty_like(s)
+    stable = s < 1.0
+    exposure[stable] = -np.expm1(k[stable] * np.log1p(-s[stable]))
+    exposure[~stable] = 1.0 - (1.0 - s[~stable]) ** k[~stable]
+    return exposure
+
+
+def network_metrics(degrees: np.ndarray, susceptibility: np.ndarray) -> Dict[str, float]:
+    """The degree and susceptibility statistics reported by the network variability study.
+
+    :param degrees: the degree of each node
+    :param susceptibility: the susceptibility of each node
+    :returns: a dict of the statistics"""
+    k = np.asarray(degrees)
+    s = np.asarray(susceptibility, dtype=float)
+    exposure = exposure_susceptibility(s, k)
+
+    res = dict()
+    res['graph_cov'] = np.std(k) / np.mean(k)
+    res['mean_individual_susceptibility'] = np.mean(s)
+    res['std_individual_susceptibility'] = np.std(s)
+    res['mean_exposure_susceptibility'] = np.mean(exposure)
+    res['std_exposure_susceptibility'] = np.std(exposure)
+    res['exposure_susceptibility_cov'] = res['std_exposure_susceptibility'] / res['mean_exposure_susceptibility']
+    res['individual_cov'] = res['std_individual_susceptibility'] / res['mean_individual_susceptibility']
+    return res
+
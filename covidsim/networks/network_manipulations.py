@@ -1,76 +1,115 @@
 """
 This module contains various methods for the purpose of applying manipulations to the population network,
 either before or during a simulation.
+
+Node susceptibilities are drawn by samplers, looked up by the study's variability_method in a registry.  A sampler
+takes the number of nodes, the two variability parameters and a numpy Generator, and returns an array with the
+susceptibility of every node, drawn in bulk.  Further samplers can be added with register_susceptibility_sampler.
 """
-import random
 import numpy as np
 
-from dataclasses import asdict
+from typing import Callable, Dict
+
+from covidsim.networks.csr_graph import CSRGraph
+
+
+SusceptibilitySampler = Callable[[int, float, float, np.random.Generator], np.ndarray]
+
+_susceptibility_samplers: Dict[str, SusceptibilitySampler] = {}
+
+
+def register_susceptibility_sampler(name: str, sampler: SusceptibilitySampler = None):
+    """Registers a susceptibility sampler under a variability_method name, replacing any sampler already registered
+    under it.  Can be used as a decorator, as register_susceptibility_sampler(name).
+
+    :param name: the variability_method that selects the sampler
+    :param sampler: function (n, variability_param_1, variability_param_2, rng) returning n susceptibilities"""
+    if sampler is None:
+        return lambda f: register_susceptibility_sampler(name, f)
+    _susceptibility_samplers[name] = sampler
+    return sampler
+
 
-from covidsim.datastructures import StudyParams, VariabilityStudyParams
+def susceptibility_sampler(name: str) -> SusceptibilitySampler:
+    """The sampler registered under a variability_method name."""
+    try:
+        return _susceptibility_samplers[name]
+    except KeyError:
+        raise ValueError('Unknown variability method {} (known methods are {})'.format(
+            name, ', '.join(sorted(_susceptibility_samplers)))) from None
+
+
+@register_susceptibility_sampler('balanced_polynomial')
+def balanced_polynomial_susceptibility(n: int, exponent: float, _, rng: np.random.Generator) -> np.ndarray:
+    """Raises random numbers (0 < num < 1) by an exponent, increasing the prevalence of low probabilities.
+    These were meant to be balanced by taking a complement every other number, but the original per-node code only
+    alternated once, so every number after the first is complemented and the mean tends towards 1 - 1/(1 + exponent).
+    Studies recorded with this method depend on that, so it is kept."""
+    s = rng.random(n) ** exponent
+    s[1:] = 1.0 - s[1:]
+    return s
+
+
+@register_susceptibility_sampler('alternating_polynomial')
+def alternating_polynomial_susceptibility(n: int, exponent: float, _, rng: np.random.Generator) -> np.ndarray:
+    """balanced_polynomial as it was meant to be: raises random numbers (0 < num < 1) by an exponent, and
+    complements every other one, so the mean susceptibility tends towards 0.5."""
+    s = rng.random(n) ** exponent
+    s[1::2] = 1.0 - s[1::2]
+    return s
+
+
+@register_susceptibility_sampler('constant')
+def constant_susceptibility(n: int, susceptibility: float, _, rng: np.random.Generator) -> np.ndarray:
+    """Constant value susceptibility."""
+    return np.full(n, susceptibility, dtype=float)
+
+
+@register_susceptibility_sampler('gamma')
+def gamma_susceptibility(n: int, target_mean: float, target_cv: float, rng: np.random.Generator) -> np.ndarray:
+    """Assigns susceptibility based on a gamma function with parameters taken from the study params."""
+    target_std = target_mean * target_cv
+    target_variance = target_std ** 2
+    shape = (target_mean ** 2) / target_variance
+    scale = target_variance / target_mean
+    return rng.gamma(shape, scale, size=n)
 
 
 class NetworkInitialization:
     """Initializes all of the nodes of the network.  Based on the parameters
-    of the specific study.  TODO: Make this a plugin structure"""
+    of the specific study."""
 
-    def __init__(self, params):
+    def __init__(self, params, rng: np.random.Generator = None):
         self.params = params
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def susceptibilities(self, n: int) -> np.ndarray:
+        """Draws the susceptibilities of n nodes with the study's variability method, or returns None if the study
+        has none."""
+        if 'variability_method' not in self.params:
+            return None
+        sampler = susceptibility_sampler(self.params['variability_method'])
+        return sampler(n, self.params.get('variability_param_1'), self.params.get('variability_param_2'), self.rng)
 
     def setup_nodes(self, g):
-        context = {}
-        context['total_nodes'] = len(g.nodes)
-
-        index = 0
-        for node_num in g.nodes:
-            node = g.nodes[node_num]
-            node['infected'] = 0
-            node['day_infected'] = -1
-            context['index'] = index
-            context['node'] = node
-            index += 1
-
-            if 'variability_method' in self.params:
-                if self.params['variability_method'] == 'balanced_polynomial':
-                    self._balanced_polynomial_susceptibility(node, context, self.params['variability_param_1'])
-
-                if self.params['variability_method'] == 'gamma':
-                    self._gamma_susceptibility(node, self.params['variability_param_1'], self.params['variability_param_2'])
-
-                if self.params['variability_method'] == 'constant':
-                    self._constant_susceptibility(node, context,
-                                                  self.params['variability_param_1'],
-                                                  self.params['variability_param_2'])
-
-    @staticmethod
-    def _balanced_polynomial_susceptibility(node, context, exponent: float):
-        """Raises random numbers (0 < num < 1) by an exponent, increasing the prevalence of low probabilities.
-        These are balanced by taking a complement every other number.  The mean susceptibility will always tend
-        towards 0.5."""
-
-        if 'even_node' not in context:
-            context['even_node'] = False
-
-        if context['even_node']:
-            node['susceptibility'] = 1.0 - random.random() ** exponent
+        """Marks every node of g uninfected and draws its susceptibility.  g may be a networkx graph, whose nodes
+        get attributes in node order, or a CSRGraph, whose node_attributes get arrays."""
+        if isinstance(g, CSRGraph):
+            n = g.number_of_nodes()
+            g.node_attributes['infected'] = np.zeros(n, dtype=np.int32)
+            g.node_attributes['day_infected'] = np.full(n, -1, dtype=np.int32)
+            s = self.susceptibilities(n)
+            if s is not None:
+                g.node_attributes['susceptibility'] = s
         else:
-            node['susceptibility'] = random.random() ** exponent
-
-            context['even_node'] = not context['even_node']
-
-    @staticmethod
-    def _constant_susceptibility(node, context, susceptibility: float):
-        """Constant value susceptibility."""
-
-        node['susceptibility'] = susceptibility
-
-    @staticmethod
-    def _gamma_susceptibility(node, target_mean: float, target_cv: float):
-        """Assigns susceptibility based on a gamma function with parameters taken from the study params."""
-        target_std = target_mean * target_cv
-        target_variance = target_std ** 2
-        shape = (target_mean ** 2) / target_variance
-        scale = target_variance / target_mean
-        node['susceptibility'] = np.random.gamma(shape, scale)
-        # if node['susceptibility'] > 1.0:
-        #     node['susceptibility'] = 1.0
+            # A single pass over the node dicts: nx.set_node_attributes looks every node up again
+            s = self.susceptibilities(g.number_of_nodes())
+            if s is None:
+                for (_, data) in g.nodes(data=True):
+                    data['infected'] = 0
+                    data['day_infected'] = -1
+            else:
+                for (_, data), susceptibility in zip(g.nodes(data=True), s.tolist()):
+                    data['infected'] = 0
+                    data['day_infected'] = -1
+                    data['susceptibility'] = susceptibility
@@ -3,12 +3,15 @@ This code is taken from the epydemic advanced tutorial.
 
 It creates a network with a powerlaw distribution of connectivity, cutoff at a certain maximum node degree.
 """
-import networkx as nx
+import functools
 import math
 import numpy as np
 from mpmath import polylog as Li   # use standard name
 
+from covidsim.networks.configuration_model import configuration_model_csr
 
+
+@functools.lru_cache(maxsize=None)
 def make_powerlaw_with_cutoff(alpha, kappa ):
     '''Create a model function for a powerlaw distribution with exponential cutoff.
 
@@ -21,37 +24,97 @@ def make_powerlaw_with_cutoff(alpha, kappa ):
     return p
 
 
-def generate_from(N, p, maxdeg = 100 ):
+def degree_distribution(p, maxdeg = 100 ):
+    '''Tabulate a model function as the distribution of node degrees that
+    generate_from draws from: degrees 1 to maxdeg - 1, with probabilities
+    proportional to the model function.
+
+    :param p: model function
+    :param maxdeg: maximum node degree we'll consider (defaults to 100)
+    :returns: a pair of arrays, the probability of each degree and its cumulative distribution'''
+    pmf = np.array([float(p(k)) for k in range(1, maxdeg)])
+    pmf = pmf / np.sum(pmf)
+    cdf = np.cumsum(pmf)
+    cdf[-1] = 1.0
+    return pmf, cdf
+
+
+@functools.lru_cache(maxsize=None)
+def powerlaw_with_cutoff_distribution(alpha, kappa, maxdeg = 100 ):
+    '''Tabulate the powerlaw distribution with exponential cutoff as
+    degree_distribution does for make_powerlaw_with_cutoff(alpha, kappa).
+    The polylog normalising constant cancels out over the table, so this
+    needs only NumPy, and each table is computed once and then shared.
+
+    :param alpha: the exponent of the distribution
+    :param kappa: the degree cutoff
+    :param maxdeg: maximum node degree we'll consider (defaults to 100)
+    :returns: a pair of read-only arrays, the probability of each degree and its cumulative distribution'''
+    k = np.arange(1, maxdeg, dtype=float)
+    pmf = np.power(k, -alpha) * np.exp(-k / kappa)
+    pmf = pmf / np.sum(pmf)
+    cdf = np.cumsum(pmf)
+    cdf[-1] = 1.0
+
+    pmf.flags.writeable = False
+    cdf.flags.writeable = False
+    return pmf, cdf
+
+
+def generate_from(N, p, maxdeg = 100, rng = None ):
     '''Generate a random graph with degree distribution described
     by a model function.
 
     :param N: number of numbers to generate
     :param p: model function
     :param maxdeg: maximum node degree we'll consider (defaults to 100)
+    :param rng: numpy Generator to draw from (defaults to a fresh one)
+    :returns: a network with the given degree distribution'''
+    _, cdf = degree_distribution(p, maxdeg)
+    return generate_from_distribution(N, cdf, rng)
+
+
+def generate_from_distribution(N, cdf, rng = None ):
+    '''Generate a random graph whose node degrees are drawn from a
+    tabulated distribution, as returned by degree_distribution.
+
+    :param N: number of numbers to generate
+    :param cdf: cumulative distribution of degrees 1, 2, ...
+    :param rng: numpy Generator to draw from (defaults to a fresh one)
     :returns: a network with the given degree distribution'''
+    return generate_csr_from_distribution(N, cdf, rng).to_networkx()
+
+
+def generate_csr_from_distribution(N, cdf, rng = None ):
+    '''As generate_from_distribution, but returning the network as a CSRGraph.'''
+    if rng is None:
+        rng = np.random.default_rng()
+    ns = sample_degrees(N, cdf, rng)
+
+    # populate the network using the configuration
+    # model with the given degree distribution, keeping
+    # the giant component without self-loops
+    return configuration_model_csr(ns, rng)
+
 
-    # construct degrees according to the distribution given
-    # by the model function
-    ns = []
-    t = 0
-    for i in range(N):
-        while True:
-            k = 1 + int (np.random.random() * (maxdeg - 1))
-            if np.random.random() < p(k):
-                ns = ns + [ k ]
-                t = t + k
-                break
+def sample_degrees(N, cdf, rng = None ):
+    '''Draw a degree sequence with an even sum from a tabulated
+    distribution, as generate_csr_from_distribution wires up.
+
+    :param N: number of numbers to generate
+    :param cdf: cumulative distribution of degrees 1, 2, ...
+    :param rng: numpy Generator to draw from (defaults to a fresh one)
+    :returns: an array of N degrees'''
+    if rng is None:
+        rng = np.random.default_rng()
+
+    # construct degrees according to the distribution, by
+    # inverting it for all the nodes at once
+    ns = 1 + np.searchsorted(cdf, rng.random(N), side = 'right')
 
     # if the sequence is odd, choose a random element
     # and increment it by 1 (this doesn't change the
     # distribution significantly, and so is safe)
-    if t % 2 != 0:
-        i = int(np.random.random() * len(ns))
-        ns[i] = ns[i] + 1
-
-    # populate the network using the configuration
-    # model with the given degree distribution
-    g = nx.configuration_model(ns, create_using = nx.Graph())
-    g = g.subgraph(max(nx.connected_components(g), key = len)).copy()
-    g.remove_edges_from(list(nx.selfloop_edges(g)))
-    return g
\ No newline at end of file
+    if np.sum(ns) % 2 != 0:
+        ns[rng.integers(N)] += 1
+    return ns
@@ -0,0 +1,89 @@
+"""
+CSR networks shared between processes.
+
+Worker processes running replicates over one fixed network would each otherwise hold a copy of it.  Instead, the
+parent process can publish the network's CSR arrays and static node attributes (such as susceptibility) to
+multiprocessing.shared_memory segments, and the workers attach to them read-only.  Each worker then holds only the
+per-run state it changes, so memory grows with that rather than with the network's size times the number of workers.
+"""
+import numpy as np
+
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, Tuple
+
+from covidsim.networks.csr_graph import CSRGraph
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    """Where to find an array in shared memory."""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+@dataclass(frozen=True)
+class SharedGraphHandle:
+    """Where to find a published network, to pass to the processes attaching it."""
+    offsets: SharedArray
+    neighbours: SharedArray
+    node_attributes: Dict[str, SharedArray]
+    edge_layers: SharedArray = None
+
+
+class SharedGraph:
+    """A network published to shared memory.  The publishing process owns the segments, and must close() them (or
+    use the SharedGraph as a context manager) once the processes attaching them have finished with them.
+
+    :param g: the network to publish"""
+
+    def __init__(self, g: CSRGraph):
+        self._segments = []
+        try:
+            self.handle = SharedGraphHandle(self._publish(g.offsets), self._publish(g.neighbours),
+                                            {a: self._publish(v) for (a, v) in g.node_attributes.items()},
+                                            self._publish(g.edge_layers) if g.edge_layers is not None else None)
+        except BaseException:
+            self.close()
+            raise
+
+    def _publish(self, a: np.ndarray) -> SharedArray:
+        a = np.ascontiguousarray(a)
+        segment = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+        self._segments.append(segment)
+        np.ndarray(a.shape, dtype=a.dtype, buffer=segment.buf)[...] = a
+        return SharedArray(segment.name, a.shape, a.dtype.str)
+
+    def close(self):
+        """Releases the segments.  Processes that have attached the network keep their mappings."""
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments = []
+
+    def __enter__(self) -> 'SharedGraph':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# Segments attached by this process, kept open for as long as the process runs, since the arrays viewing them
+# cannot outlive them
+_attached = dict()
+
+
+def attach(handle: SharedGraphHandle) -> CSRGraph:
+    """Attaches a published network, as a CSRGraph of read-only arrays viewing the shared segments."""
+    return CSRGraph(_attach_array(handle.offsets), _attach_array(handle.neighbours),
+                    {a: _attach_array(s) for (a, s) in handle.node_attributes.items()},
+                    _attach_array(handle.edge_layers) if handle.edge_layers is not None else None)
+
+
+def _attach_array(s: SharedArray) -> np.ndarray:
+    if s.name not in _attached:
+        _attached[s.name] = shared_memory.SharedMemory(name=s.name)
+    a = np.ndarray(s.shape, dtype=np.dtype(s.dtype), buffer=_attached[s.name].buf)
+    a.flags.writeable = False
+    return a
@@ -0,0 +1,77 @@
+"""
+Building values ahead of time in a background process.
+
+Some values, such as the network of each run of a randomize_network study, take a while to build but can be worked
+out in advance.  A Prefetcher builds the values that are expected to be asked for next in a worker process while the
+caller gets on with something else, so that when they are asked for they are ready, or at least partly built.  At
+most depth values are built ahead, which caps the memory they take.
+"""
+import weakref
+
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Hashable, List, Tuple
+
+
+class Prefetcher:
+    """Builds the values expected to be asked for next in a background worker process.
+
+    Each value is identified by a key, and is built by calling build with the arguments given alongside it.  build
+    and its arguments must be picklable, since the value is built in another process.
+
+    :param build: the function building the values
+    :param depth: the most values to build ahead"""
+
+    def __init__(self, build: Callable, depth: int):
+        self._build = build
+        self._depth = depth
+        self._ahead = OrderedDict()  # Key -> Future of its value, in the order they were asked for
+        self._executor = None
+        self._finalizer = None
+
+    def get(self, key: Hashable, args: tuple, upcoming: List[Tuple[Hashable, tuple]] = None):
+        """Returns the value for key, and starts building the values expected to be asked for next.  The value is
+        taken from those built ahead if it was one of them, and built here otherwise.  Values built ahead that are
+        no longer expected are dropped.
+
+        :param key: the key of the value
+        :param args: the arguments to build the value from
+        :param upcoming: the (key, args) pairs of the values expected next, in order
+        :returns: the value"""
+        f = self._ahead.pop(key, None)
+        self.prefetch(upcoming if upcoming is not None else [])
+        if f is None:
+            return self._build(*args)
+        return f.result()
+
+    def prefetch(self, upcoming: List[Tuple[Hashable, tuple]]):
+        """Makes the first depth of the upcoming (key, args) pairs the values built ahead."""
+        expected = OrderedDict(upcoming[:self._depth])
+        for key in [k for k in self._ahead if k not in expected]:
+            self._ahead.pop(key).cancel()
+        for (key, args) in expected.items():
+            if key not in self._ahead:
+                self._ahead[key] = self._submit(args)
+
+    def close(self):
+        """Drops the values built ahead and stops the worker process."""
+        for f in self._ahead.values():
+            f.cancel()
+        self._ahead.clear()
+        if self._finalizer is not None:
+            self._finalizer()
+            self._executor = self._finalizer = None
+
+    def _submit(self, args: tuple) -> Future:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=1)
+            self._finalizer = weakref.finalize(self, _shutdown, self._executor, self._ahead)
+        return self._executor.submit(self._build, *args)
+
+
+def _shutdown(executor: ProcessPoolExecutor, ahead: OrderedDict):
+    """Cancels the values not yet started and stops the worker process, without waiting for a value being built.
+    Executor.shutdown's cancel_futures argument would do the cancelling, but needs Python 3.9."""
+    for f in ahead.values():
+        f.cancel()
+    executor.shutdown(wait=False)
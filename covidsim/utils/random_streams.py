@@ -0,0 +1,76 @@
+"""
+Reproducible random number streams for simulation runs.
+
+Every run draws from its own numpy Generator, derived from a root seed and the index of the run with a SeedSequence,
+so a run can be reproduced from those two numbers alone and runs in different processes get independent streams.
+Networks are built from streams of their own, so that a network is the same whether it is built or loaded from a
+cache, and the nodes of each run's network are initialized from a stream of their own, so that the network can be
+built ahead of the run.
+epydemic draws from the global random and np.random modules internally, so those are seeded from the run's
+SeedSequence as well.
+"""
+import random
+import numpy as np
+
+
+# First word of the spawn keys of network streams; run indices never reach it
+NETWORK_STREAMS = 0xFFFFFFFF
+
+# Last word of the spawn key of a run's node initialization stream, after the two children generator_for_run spawns
+NODE_STREAM = 2
+
+
+def run_seed_sequence(root_seed: int, run_index: int) -> np.random.SeedSequence:
+    """The SeedSequence of one run: the run_index'th child of the root seed."""
+    return np.random.SeedSequence(root_seed, spawn_key=(run_index,))
+
+
+def generator_for_run(root_seed: int, run_index: int) -> np.random.Generator:
+    """Returns the Generator for a run, after seeding the global random modules from the same run."""
+    model_seq, globals_seq = run_seed_sequence(root_seed, run_index).spawn(2)
+    seed_globals(globals_seq)
+    return np.random.default_rng(model_seq)
+
+
+def node_generator(root_seed: int, run_index: int) -> np.random.Generator:
+    """The Generator for initializing the nodes of a run's network.  It is separate from the run's other streams so
+    that the network can be built ahead of the run."""
+    return np.random.default_rng(np.random.SeedSequence(root_seed, spawn_key=(run_index, NODE_STREAM)))
+
+
+def network_generator(root_seed: int, network_index: int) -> np.random.Generator:
+    """The Generator for building the network_index'th network of a root seed."""
+    return np.random.default_rng(np.random.SeedSequence(root_seed, spawn_key=(NETWORK_STREAMS, network_index)))
+
+
+def seed_globals(seq: np.random.SeedSequence):
+    """Seeds the random and np.random modules from a SeedSequence."""
+    state = seq.generate_state(4)
+    random.seed(int.from_bytes(state.tobytes(), 'little'))
+    np.random.seed(state)
+
+
+class RandomStream:
+    """Uniform random numbers in [0, 1) from a Generator, for code that needs them one at a time.
+
+    A single Generator.random() call costs several times as much as random.random(), but a block of draws costs
+    little more than one, so numbers are drawn in blocks and handed out singly.
+
+    :param rng: the Generator to draw from
+    :param block: number of values to draw at a time"""
+
+    BLOCK = 4096
+
+    def __init__(self, rng: np.random.Generator, block: int = BLOCK):
+        self.rng = rng
+        self._block_size = block
+        self._block = []
+        self._next = 0
+
+    def random(self) -> float:
+        if self._next >= len(self._block):
+            self._block = self.rng.random(self._block_size).tolist()
+            self._next = 0
+        x = self._block[self._next]
+        self._next += 1
+        return x
@@ -0,0 +1,176 @@
+"""
+Statistics of many runs' timeseries, accumulated one run at a time.
+
+SeriesRange.create_from_list needs every run's series held at once.  A SeriesAggregator instead folds each series
+into running statistics for each day as it arrives, so its memory depends on the number of days and not the number
+of runs: Welford's mean and variance, and a DDSketch (Masson, Rim and Lee, VLDB 2019) for quantiles.  Both merge, so
+aggregators filled in separate processes can be combined into one.
+
+A DDSketch maps each value to a bucket by the logarithm of its magnitude, so every quantile it reports is within a
+relative accuracy alpha of a value at that rank.  Its buckets span only the range of magnitudes seen, so for
+simulation outputs it stays at a few hundred buckets a day however many runs are added.
+"""
+import numpy as np
+
+from typing import Dict, Sequence
+
+from covidsim.datastructures import SeriesRange
+
+
+class RunningMoments:
+    """Welford's running mean and variance of a series for each day, over the series added.
+
+    :param length: number of days in each series"""
+
+    def __init__(self, length: int):
+        self.count = 0
+        self.mean = np.zeros(length)
+        self._m2 = np.zeros(length)
+
+    def add(self, series: np.ndarray):
+        self.count += 1
+        delta = series - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (series - self.mean)
+
+    def merge(self, other: 'RunningMoments'):
+        """Adds the series added to another RunningMoments, by Chan et al.'s pairwise update."""
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / count)
+        self._m2 = self._m2 + other._m2 + delta ** 2 * (self.count * other.count / count)
+        self.count = count
+
+    def std(self) -> np.ndarray:
+        """The population standard deviation of each day, as np.std."""
+        return np.sqrt(self._m2 / self.count)
+
+
+class QuantileSketch:
+    """A DDSketch of the values of a series for each day, over the series added.  NaNs are ignored.
+
+    :param length: number of days in each series
+    :param relative_accuracy: relative accuracy alpha of the quantiles (defaults to 1%)
+    :param min_value: magnitude below which values count as zero (defaults to 1e-9)"""
+
+    def __init__(self, length: int, relative_accuracy: float = 0.01, min_value: float = 1e-9):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self._gamma = (1.0 + relative_accuracy) / (1.0 - relative_accuracy)
+        self._log_gamma = np.log(self._gamma)
+
+        # Counts of the buckets of positive values, and of the magnitudes of negative values, for each day, with the
+        # key of each store's first column
+        self._positive = np.zeros((length, 0), dtype=np.int64)
+        self._positive_offset = 0
+        self._negative = np.zeros((length, 0), dtype=np.int64)
+        self._negative_offset = 0
+        self._zeros = np.zeros(length, dtype=np.int64)
+
+    def add(self, series: np.ndarray):
+        days = np.arange(len(series))
+        positive = series > self.min_value
+        negative = series < -self.min_value
+        self._zeros += np.abs(series) <= self.min_value
+
+        for (mask, sign) in [(positive, 1.0), (negative, -1.0)]:
+            if np.any(mask):
+                keys = np.ceil(np.log(sign * series[mask]) / self._log_gamma).astype(np.int64)
+                counts, offset = self._store(sign, keys.min(), keys.max() + 1)
+                counts[days[mask], keys - offset] += 1
+
+    def _store(self, sign: float, lo: int, hi: int):
+        """The counts of the store of the given sign, widened to cover keys lo to hi - 1, and their offset."""
+        (counts, offset) = (self._positive, self._positive_offset) if sign > 0 else \
+            (self._negative, self._negative_offset)
+        if counts.shape[1] == 0:
+            offset = lo
+        start = min(lo, offset)
+        end = max(hi, offset + counts.shape[1])
+        if (start, end) != (offset, offset + counts.shape[1]):
+            counts = np.pad(counts, ((0, 0), (offset - start, end - offset - counts.shape[1])))
+            offset = start
+            if sign > 0:
+                (self._positive, self._positive_offset) = (counts, offset)
+            else:
+                (self._negative, self._negative_offset) = (counts, offset)
+        return (counts, offset)
+
+    def merge(self, other: 'QuantileSketch'):
+        """Adds the values added to another sketch, which must have the same relative accuracy."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Cannot merge sketches of relative accuracy {a} and {b}'.format(
+                a=self.relative_accuracy, b=other.relative_accuracy))
+        self._zeros += other._zeros
+        for (sign, counts, offset) in [(1.0, other._positive, other._positive_offset),
+                                       (-1.0, other._negative, other._negative_offset)]:
+            if counts.shape[1] > 0:
+                (mine, mine_offset) = self._store(sign, offset, offset + counts.shape[1])
+                mine[:, offset - mine_offset:offset - mine_offset + counts.shape[1]] += counts
+
+    def quantile(self, q: float) -> np.ndarray:
+        """The q-quantile of each day, or NaN for days with no values."""
+        # Buckets in increasing order of value: negatives from the largest magnitude down, zero, then positives
+        counts = np.hstack([self._negative[:, ::-1], self._zeros[:, np.newaxis], self._positive])
+        values = np.hstack([-self._value(self._negative_offset + np.arange(self._negative.shape[1]))[::-1],
+                            [0.0],
+                            self._value(self._positive_offset + np.arange(self._positive.shape[1]))])
+
+        cumulative = np.cumsum(counts, axis=1)
+        total = cumulative[:, -1]
+        rank = q * (total - 1)
+        bucket = np.argmax(cumulative > rank[:, np.newaxis], axis=1)
+        return np.where(total > 0, values[bucket], np.nan)
+
+    def _value(self, keys: np.ndarray) -> np.ndarray:
+        """The value representing each bucket, within the relative accuracy of every value in it."""
+        return 2.0 * self._gamma ** keys / (self._gamma + 1.0)
+
+
+class SeriesAggregator:
+    """Accumulates the series of many runs into the statistics of a SeriesRange, one run at a time.  Series are cut
+    or padded with zeros to the length, as SeriesRange.create_from_list pads them.
+
+    :param length: number of days in each series
+    :param smoothing: width of the moving average to smooth the mean with (defaults to 0 for none)
+    :param quantiles: quantiles to report bands for (defaults to 5%, 50% and 95%)
+    :param relative_accuracy: relative accuracy of the quantiles (defaults to 1%)"""
+
+    def __init__(self, length: int, smoothing: int = 0, quantiles: Sequence[float] = (0.05, 0.5, 0.95),
+                 relative_accuracy: float = 0.01):
+        self.length = length
+        self.smoothing = smoothing
+        self.quantiles = tuple(quantiles)
+        self.moments = RunningMoments(length)
+        self.sketch = QuantileSketch(length, relative_accuracy)
+
+    def __len__(self) -> int:
+        return self.moments.count
+
+    def add(self, series: Sequence[float]):
+        """Adds the series of one run."""
+        values = np.zeros(self.length)
+        n = min(len(series), self.length)
+        values[:n] = np.asarray(series[:n], dtype=float)
+        self.moments.add(values)
+        self.sketch.add(values)
+
+    def merge(self, other: 'SeriesAggregator'):
+        """Adds the series added to another aggregator of the same length, such as one filled by another process."""
+        if other.length != self.length:
+            raise ValueError('Cannot merge series of {a} days with series of {b} days'.format(
+                a=self.length, b=other.length))
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+
+    def series_range(self) -> SeriesRange:
+        """The SeriesRange that create_from_list would give for the series added, with the quantile bands."""
+        res = SeriesRange(None, None, None).create_from_moments(self.moments.mean.copy(), self.moments.std(),
+                                                                 self.length, self.smoothing)
+        res.quantiles = self.quantile_bands()
+        return res
+
+    def quantile_bands(self) -> Dict[float, np.ndarray]:
+        return {q: self.sketch.quantile(q) for q in self.quantiles}
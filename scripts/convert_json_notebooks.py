@@ -0,0 +1,29 @@
+"""
+Converts the JSON lab notebooks of earlier studies to binary notebooks, which the report scripts read.
+
+Each notebook is written beside its JSON file with a .nb extension.  Results recorded before a study parameter was
+added take that parameter's default, so they match the parameters of the run scripts as before.  Run it once, from
+the scripts directory; it overwrites any binary notebooks of the same names.
+
+Parameters:
+
+    notebooks:          The JSON notebooks to convert.
+"""
+from dataclasses import asdict
+
+from covidsim.datastructures import VariabilityStudyParams
+from covidsim.experiments.binary_notebook import BinaryLabNotebook
+
+notebooks = ['variability-study.json', 'bp-network-variability-study.json', 'orig-network-variability-study.json']
+
+
+def main():
+    defaults = asdict(VariabilityStudyParams())
+    for json_name in notebooks:
+        nb = BinaryLabNotebook.from_json(json_name, defaults=defaults)
+        print(f'Converted {len(nb.results())} results from {json_name} to {nb.name()}')
+        nb.close()
+
+
+if __name__ == "__main__":
+    main()
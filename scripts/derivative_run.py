@@ -13,8 +13,8 @@ Parameters:
     time_scale:         Multiplier that converts model time units to days.
     days_to_run:        Cutoff number of days for model run.
     variability_method: Method with which to vary the susceptibility of individuals.  "constant", "gamma",
-                        or "balanced_polynomial".
-    variability_param1: First parameter for variability method.  For "balanced_polynomial", this is the exponent
+                        "balanced_polynomial" or "alternating_polynomial".
+    variability_param1: First parameter for variability method.  For the polynomial methods, this is the exponent
                         to which a random fraction is raised.  For "gamma", this is the shape of the gamma function.
                         For "constant", this is the susceptibility that will be applied to all individuals.
     variability_param2: Second parameter for variability method.  For "gamma", this is the scale of the gamma function.
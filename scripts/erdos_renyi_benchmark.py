@@ -0,0 +1,48 @@
+"""
+Benchmarks the sparse Erdos-Renyi generator against networkx.
+
+Builds G(n, p) networks with a fixed mean degree over a range of populations, timing the sparse generator (which
+should scale linearly in the population) and, for the smaller populations, networkx's erdos_renyi_graph (which tests
+every pair of nodes, so scales quadratically).
+
+Parameters:
+
+    mean_degree:        Mean node degree, as network_param_1 in the studies.
+    populations:        Populations to time the sparse generator at.
+    networkx_limit:     Largest population to also time networkx at.
+"""
+import time
+import networkx as nx
+import numpy as np
+
+from covidsim.networks.erdos_renyi import erdos_renyi_csr
+
+mean_degree = 4.0
+populations = [10_000, 20_000, 100_000, 1_000_000, 3_000_000]
+networkx_limit = 20_000
+
+
+def main():
+    rng = np.random.default_rng()
+
+    print('{:>12} {:>12} {:>14} {:>14} {:>12}'.format('population', 'edges', 'sparse (s)', 'per node (us)',
+                                                        'networkx (s)'))
+    for population in populations:
+        phi = mean_degree / population
+
+        start = time.perf_counter()
+        g = erdos_renyi_csr(population, phi, rng)
+        sparse = time.perf_counter() - start
+
+        networkx = ''
+        if population <= networkx_limit:
+            start = time.perf_counter()
+            nx.erdos_renyi_graph(population, phi)
+            networkx = '{:.2f}'.format(time.perf_counter() - start)
+
+        print('{:>12} {:>12} {:>14.3f} {:>14.3f} {:>12}'.format(population, g.number_of_edges(), sparse,
+                                                                 1e6 * sparse / population, networkx))
+
+
+if __name__ == "__main__":
+    main()
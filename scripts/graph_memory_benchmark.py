@@ -0,0 +1,67 @@
+"""
+Benchmarks the memory taken by populations held as compact CSR graphs against networkx graphs.
+
+Builds Erdos-Renyi networks with a fixed mean degree over a range of populations, with node susceptibilities and
+edge layer tags, and reports the memory of the CSR arrays (and the peak memory of building them) in bytes per node
+and bytes per edge.  For the smaller populations the same network is also converted to networkx, whose memory is
+measured with tracemalloc.
+
+Parameters:
+
+    mean_degree:        Mean node degree, as network_param_1 in the studies.
+    layers:             Number of edge layers to tag the edges with (0 for none).
+    populations:        Populations to build CSR graphs for.
+    networkx_limit:     Largest population to also build a networkx graph for.
+"""
+import time
+import tracemalloc
+import numpy as np
+
+from covidsim.networks.erdos_renyi import erdos_renyi_csr
+from covidsim.networks.network_manipulations import NetworkInitialization
+
+mean_degree = 4.0
+layers = 4
+populations = [10_000, 100_000, 1_000_000, 10_000_000]
+networkx_limit = 100_000
+
+susceptibility = {'variability_method': 'gamma', 'variability_param_1': 0.3, 'variability_param_2': 1.0}
+
+
+def main():
+    rng = np.random.default_rng()
+
+    print('{:>12} {:>12} {:>9} {:>10} {:>10} {:>10} {:>12} {:>12} {:>12}'.format(
+        'population', 'edges', 'time (s)', 'CSR MB', 'B/node', 'B/edge', 'peak B/node', 'nx B/node', 'nx B/edge'))
+    for population in populations:
+        tracemalloc.start()
+        start = time.perf_counter()
+        g = erdos_renyi_csr(population, mean_degree / population, rng)
+        if layers > 0:
+            # Any tagging symmetric in the two ends of an edge will do
+            src = np.repeat(np.arange(population, dtype=np.int32), g.degrees())
+            g.edge_layers = ((src + g.neighbours) % layers).astype(np.uint8)
+            del src
+        NetworkInitialization(susceptibility, rng).setup_nodes(g)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        nodes, edges, size = g.number_of_nodes(), g.number_of_edges(), g.nbytes()
+
+        nx_node = nx_edge = ''
+        if population <= networkx_limit:
+            tracemalloc.start()
+            h = g.to_networkx()
+            nx_size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del h
+            nx_node = '{:.0f}'.format(nx_size / nodes)
+            nx_edge = '{:.0f}'.format(nx_size / edges)
+
+        print('{:>12} {:>12} {:>9.2f} {:>10.1f} {:>10.1f} {:>10.1f} {:>12.1f} {:>12} {:>12}'.format(
+            nodes, edges, elapsed, size / 2 ** 20, size / nodes, size / edges, peak / nodes, nx_node, nx_edge))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ Runs the report for the network variability study.
 
 It uses the same parameters defined in network_variability_study_run.py.
 """
-import epyc
+import os
 import matplotlib
 from mpl_toolkits.mplot3d import Axes3D
 from matplotlib import cm
@@ -12,12 +12,20 @@ import numpy as np
 
 from dataclasses import asdict
 
+from covidsim.experiments.binary_notebook import BinaryLabNotebook
 from covidsim.utils.graph_utils import plot_series_range, ColorSchemes
 from scripts.network_variability_study_run import params
 
 
+notebook = 'network-variability-study.nb'
+
+
 def main():
-    nb = epyc.JSONLabNotebook('network-variability-study.json')
+    # Opening a missing notebook would create an empty one, and report nothing
+    if not os.path.isfile(notebook):
+        raise FileNotFoundError(f'No notebook {notebook}: run network_variability_study_run.py first, or convert a '
+                                'JSON notebook with convert_json_notebooks.py')
+    nb = BinaryLabNotebook(notebook)
 
     df = nb.dataframe()
 
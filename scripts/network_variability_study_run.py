@@ -13,8 +13,8 @@ Parameters:
     time_scale:         Multiplier that converts model time units to days.
     days_to_run:        Cutoff number of days for model run.
     variability_method: Method with which to vary the susceptibility of individuals.  "constant", "gamma",
-                        or "balanced_polynomial".
-    variability_param1: First parameter for variability method.  For "balanced_polynomial", this is the exponent
+                        "balanced_polynomial" or "alternating_polynomial".
+    variability_param1: First parameter for variability method.  For the polynomial methods, this is the exponent
                         to which a random fraction is raised.  For "gamma", this is the shape of the gamma function.
                         For "constant", this is the susceptibility that will be applied to all individuals.
     variability_param2: Second parameter for variability method.  For "gamma", this is the scale of the gamma function.
@@ -22,6 +22,19 @@ Parameters:
                         day until an end day and have a certain percent chance per individual of cancelling an
                         infection.  The string should be formatted "{day_start}, {day_end}, {effectiveness}".
     intervention_2:     A string representing a second intervention.
+    network_cache:      Directory in which to cache generated networks, so that later runs and other worker
+                        processes load them (memory-mapped) rather than generating them again.  None for no cache.
+    network_pool_size:  With randomize_network, the number of networks the runs cycle through, so that sweep points
+                        differing only in susceptibility parameters reuse the same networks.  0 gives every run a
+                        new network.
+    network_prefetch:   With randomize_network, the number of runs ahead for which to build networks in a background
+                        process while the current run goes on.  Worth setting when the lab runs one process
+                        (ParallelLab with cores=1), which is given the runs in order; 0 builds each network when its
+                        run starts.
+    metrics_only:       Opt-in for large sweeps.  Takes the metrics from sampled degree sequences without wiring the
+                        networks, approximating the trimming of powerlaw_cutoff networks to their giant components, so
+                        the metrics differ slightly from those of the wired networks.  Much faster; False (the
+                        default) wires each network and measures its exact giant component.
 
 """
 import epyc
@@ -29,8 +42,10 @@ import numpy as np
 
 from dataclasses import asdict
 
+from covidsim.experiments.binary_notebook import BinaryLabNotebook
 from covidsim.experiments.network_variability_study import NetworkVariabilityExperiment
 from covidsim.datastructures import VariabilityStudyParams
+from covidsim.experiments.parallel_lab import ParallelLab
 
 # TODO: Add UI to set / save / reload parameters.
 params = VariabilityStudyParams()
@@ -56,8 +71,8 @@ def main():
     e = NetworkVariabilityExperiment(params)
 
     # TODO: Add capability to save study file in user-specified location
-    nb = epyc.JSONLabNotebook('network-variability-study.json')
-    lab = epyc.Lab(nb)
+    nb = BinaryLabNotebook('network-variability-study.nb')
+    lab = ParallelLab(nb)
 
     for key in asdict(params):
         lab[key] = asdict(params)[key]
@@ -3,19 +3,27 @@ Runs the report for the variability study.
 
 It uses the same parameters defined in variability_study_run.py.
 """
-import epyc
+import os
 import matplotlib.pyplot as plt
 import numpy as np
 
 from dataclasses import asdict
 
+from covidsim.experiments.binary_notebook import BinaryLabNotebook
 from covidsim.experiments.variability_study import VariabilityExperiment
 from covidsim.utils.graph_utils import plot_series_range, ColorSchemes
 from scripts.variability_study_run import params
 
 
+notebook = 'variability-study.nb'
+
+
 def main():
-    nb = epyc.JSONLabNotebook('variability-study.json')
+    # Opening a missing notebook would create an empty one, and report nothing
+    if not os.path.isfile(notebook):
+        raise FileNotFoundError(f'No notebook {notebook}: run variability_study_run.py first, or convert a JSON '
+                                'notebook with convert_json_notebooks.py')
+    nb = BinaryLabNotebook(notebook)
 
     errors = 0
     successful = 0
@@ -13,8 +13,8 @@ Parameters:
     time_scale:         Multiplier that converts model time units to days.
     days_to_run:        Cutoff number of days for model run.
     variability_method: Method with which to vary the susceptibility of individuals.  "constant", "gamma",
-                        or "balanced_polynomial".
-    variability_param1: First parameter for variability method.  For "balanced_polynomial", this is the exponent
+                        "balanced_polynomial" or "alternating_polynomial".
+    variability_param1: First parameter for variability method.  For the polynomial methods, this is the exponent
                         to which a random fraction is raised.  For "gamma", this is the shape of the gamma function.
                         For "constant", this is the susceptibility that will be applied to all individuals.
     variability_param2: Second parameter for variability method.  For "gamma", this is the scale of the gamma function.
@@ -22,14 +22,36 @@ Parameters:
                         day until an end day and have a certain percent chance per individual of cancelling an
                         infection.  The string should be formatted "{day_start}, {day_end}, {effectiveness}".
     intervention_2:     A string representing a second intervention.
+    dynamics:           "stochastic" fires infection events at the full rate and discards those cancelled by
+                        susceptibility or interventions.  "rejection_free" folds both into the event rates, giving
+                        statistically equivalent epidemics with far fewer events.  "discrete" advances the whole
+                        population in fixed time steps with vectorized NumPy operations, which is much faster on
+                        large populations.
+    steps_per_day:      Number of time steps per day for the "discrete" dynamics.
+    ensemble_size:      For the "discrete" dynamics, the number of replicates to advance together over one network.
+                        Each replicate is stored in the notebook as a separate result.
+    seed:               Root seed of the random numbers.  Each run draws from streams derived from the seed and the
+                        index of the run, both recorded in its metadata, so a study can be reproduced.  None (the
+                        default) picks a fresh seed.
+    network_cache:      Directory in which to cache generated networks, so that later runs and other worker
+                        processes load them (memory-mapped) rather than generating them again.  None for no cache.
+    network_pool_size:  With randomize_network, the number of networks the runs cycle through, so that sweep points
+                        differing only in epidemic or susceptibility parameters reuse the same networks.  0 gives
+                        every run a new network.
+    network_prefetch:   With randomize_network, the number of runs ahead for which to build networks in a background
+                        process while the current run goes on.  Worth setting when the lab runs one process
+                        (ParallelLab with cores=1), which is given the runs in order; 0 builds each network when its
+                        run starts.
 
 """
 import epyc
 
 from dataclasses import asdict
 
+from covidsim.experiments.binary_notebook import BinaryLabNotebook
 from covidsim.experiments.variability_study import VariabilityExperiment
 from covidsim.datastructures import VariabilityStudyParams
+from covidsim.experiments.parallel_lab import ParallelLab
 
 # TODO: Add UI to set / save / reload parameters.
 params = VariabilityStudyParams()
@@ -52,8 +74,8 @@ def main():
     e = VariabilityExperiment(params)
 
     # TODO: Add capability to save study file in user-specified location
-    nb = epyc.JSONLabNotebook('variability-study.json')
-    lab = epyc.Lab(nb)
+    nb = BinaryLabNotebook('variability-study.nb')
+    lab = ParallelLab(nb)
 
     for key in asdict(params):
         lab[key] = asdict(params)[key]
@@ -0,0 +1,50 @@
+"""
+Module contains tests for the vectorized discrete-time SIR engine.
+"""
+import pluggy
+import pytest
+
+from dataclasses import asdict
+
+from covidsim.datastructures import StudyParams
+from covidsim.dynamics.discrete_time import DiscreteTimeSIR
+from covidsim.models import model_events
+from covidsim.networks.csr_graph import CSRGraph
+
+
+@pytest.fixture
+def engine() -> DiscreteTimeSIR:
+    pm = pluggy.PluginManager("infectionmodel")
+    pm.add_hookspecs(model_events)
+    pm.register(model_events.InfectionsAndInfectedTracker)
+
+    return DiscreteTimeSIR(pm.hook)
+
+
+def test_discrete_run_produces_tracked_sir_results(engine: DiscreteTimeSIR, powerlaw_cutoff_network):
+    """The engine reports the same result keys as TrackedSIR, with consistent compartment sizes."""
+    params = asdict(StudyParams(pInfected=0.1, pRemove=0.04, time_scale=0.5, dynamics='discrete'))
+    g = CSRGraph.from_networkx(powerlaw_cutoff_network)
+
+    res = engine.run(g, params)
+
+    for key in ['S', 'I', 'R', 'daily_infections', 'currently_infected', 'daily_r', 'mean_infection_length']:
+        assert key in res
+    assert res['S'] + res['I'] + res['R'] == g.number_of_nodes()
+    assert res['I'] == 0
+    assert len(res['daily_infections']) == params['days_to_run']
+    assert sum(res['daily_infections']) <= res['R']
+
+
+def test_ensemble_runs_independent_replicates(engine: DiscreteTimeSIR, powerlaw_cutoff_network):
+    """Each replicate of an ensemble is a complete, separate epidemic over the shared network."""
+    params = asdict(StudyParams(pInfected=0.1, pRemove=0.04, time_scale=0.5, dynamics='discrete'))
+    g = CSRGraph.from_networkx(powerlaw_cutoff_network)
+
+    results = engine.run_ensemble(g, params, 3)
+
+    assert len(results) == 3
+    assert len(engine.node_states) == 3
+    for k, res in enumerate(results):
+        assert res['S'] + res['I'] + res['R'] == g.number_of_nodes()
+        assert engine.events[k] >= res['R']
@@ -0,0 +1,64 @@
+"""
+Module contains tests for the Gillespie dynamics with scheduled rate changes.
+"""
+import random
+import numpy as np
+import pluggy
+
+from dataclasses import asdict
+from epydemic import StochasticDynamics
+
+from covidsim.datastructures import VariabilityStudyParams
+from covidsim.dynamics.scheduled_stochastic import ScheduledStochasticDynamics
+from covidsim.experiments.variability_study import VariabilityExperiment
+from covidsim.models import model_events
+from covidsim.models.tracked_sir import TrackedSIR
+from covidsim.networks.network_manipulations import NetworkInitialization
+from covidsim.utils.random_streams import RandomStream
+
+params = VariabilityStudyParams(population=300, pInfected=0.05, pRemove=0.1, time_scale=0.5, days_to_run=100,
+                                variability_method='constant', variability_param_1=0.6, seed=11,
+                                intervention_1='10, 30, 0.5', intervention_2='40, 60, 0.3')
+
+
+def test_rejection_free_final_sizes_agree_with_stochastic():
+    """Over a seeded sweep with two interventions, folding susceptibility and interventions into the rates gives the
+    same distribution of final sizes as firing every event and rejecting some."""
+    sizes = dict()
+    for dynamics in ['stochastic', 'rejection_free']:
+        p = asdict(params)
+        p['dynamics'] = dynamics
+        e = VariabilityExperiment(params)
+        sizes[dynamics] = np.array([e.set(p).run()['results']['total_infected'] for _ in range(40)], dtype=float)
+
+    (a, b) = (sizes['stochastic'], sizes['rejection_free'])
+    se = np.sqrt(np.var(a, ddof=1) / len(a) + np.var(b, ddof=1) / len(b))
+    assert abs(np.mean(a) - np.mean(b)) < 3.0 * se
+    assert np.mean(a) > 2 * params.pInfected * params.population
+
+
+def test_matches_epydemic_without_rate_changes(powerlaw_cutoff_network):
+    """With no scheduled rate changes, the same random numbers give the same epidemic as StochasticDynamics."""
+    p = asdict(params)
+    NetworkInitialization(p, np.random.default_rng(2)).setup_nodes(powerlaw_cutoff_network)
+
+    runs = []
+    for dynamics_class in [StochasticDynamics, ScheduledStochasticDynamics]:
+        pm = pluggy.PluginManager("infectionmodel")
+        pm.add_hookspecs(model_events)
+        pm.register(model_events.InfectionsAndInfectedTracker)
+        model = TrackedSIR(pm.hook)
+        model.random = RandomStream(np.random.default_rng(3))
+
+        dynamics = dynamics_class(model, powerlaw_cutoff_network)
+        if dynamics_class is ScheduledStochasticDynamics:
+            # Draw event times from np.random, as StochasticDynamics does
+            dynamics.random = np.random
+        np.random.seed(4)
+        random.seed(4)
+        res = dynamics.set(p).run()
+        runs.append((res['results'], res['metadata'][StochasticDynamics.EVENTS]))
+
+    assert model.nextRateChange(0.0) is None
+    assert runs[0] == runs[1]
+    assert runs[0][1] > 0
@@ -0,0 +1,43 @@
+"""
+Module contains tests for the experiment set up shared by the studies.
+"""
+from dataclasses import asdict, replace
+
+from covidsim.datastructures import VariabilityStudyParams
+from covidsim.experiments.variability_study import VariabilityExperiment
+
+
+def test_seeded_runs_are_reproducible():
+    """Runs with the same seed and run index give the same results, and record where their streams came from."""
+    params = VariabilityStudyParams(population=300, pInfected=0.05, pRemove=0.04, time_scale=0.5, days_to_run=100,
+                                    variability_method='gamma', variability_param_1=0.3, seed=42)
+
+    runs = []
+    for _ in range(2):
+        e = VariabilityExperiment(params)
+        runs.append([e.set(asdict(params)).run() for _ in range(2)])
+
+    for (first, second) in zip(runs[0], runs[1]):
+        assert first['results'] == second['results']
+        assert first['metadata'][VariabilityExperiment.SEED] == 42
+    assert [r['metadata'][VariabilityExperiment.RUN_INDEX] for r in runs[0]] == [0, 1]
+
+
+def test_randomized_networks_built_ahead():
+    """Each randomize_network run simulates over its own network, which is the same whether or not it was built
+    ahead of the run."""
+    params = VariabilityStudyParams(population=300, pInfected=0.05, pRemove=0.04, time_scale=0.5, days_to_run=100,
+                                    variability_method='gamma', variability_param_1=0.3, seed=42,
+                                    randomize_network=True, network_type='erdos_renyi', network_param_1=4.0,
+                                    dynamics='discrete')
+
+    runs = []
+    for prefetch in [0, 2]:
+        e = VariabilityExperiment(replace(params, network_prefetch=prefetch))
+        runs.append([e.set(asdict(params)).run()['results'] for _ in range(3)])
+        if e.prefetcher is not None:
+            e.prefetcher.close()
+
+    assert runs[0] == runs[1]
+    assert all(r['population_size'] > 200 for r in runs[0])
+    assert runs[0][0]['graph_cov'] != runs[0][1]['graph_cov']
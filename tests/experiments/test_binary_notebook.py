@@ -0,0 +1,154 @@
+"""
+Module contains tests for the append-only binary lab notebook.
+"""
+import os
+
+import epyc
+import numpy as np
+import pytest
+
+from dataclasses import asdict
+
+from covidsim.datastructures import VariabilityStudyParams
+from covidsim.experiments.base_experiment import BaseExperiment
+from covidsim.experiments.binary_notebook import BinaryLabNotebook
+
+
+class SeriesExperiment(epyc.Experiment):
+    """Returns integer and float timeseries, and scalars, scaled by x."""
+
+    def do(self, params):
+        x = params['x']
+        return {'counts': [x * i for i in range(10)],
+                'rates': [x / (i + 1.0) for i in range(10)],
+                'total': 45 * x,
+                'label': 'x{x}'.format(x=x)}
+
+
+def test_results_read_back(tmp_path):
+    """Repeated results are read back singly, with timeseries as int32 and float32 arrays."""
+    name = str(tmp_path / 'study.nb')
+    nb = BinaryLabNotebook(name, create=True, description='series')
+    e = epyc.RepeatedExperiment(SeriesExperiment(), 2)
+    for x in [1, 2, 3]:
+        nb.addResult(e.set({'x': x}).run())
+    nb.close()
+
+    nb = BinaryLabNotebook(name)
+    assert nb.description() == 'series'
+    assert len(nb.results()) == 6
+    for res in nb.resultsFor({'x': 2}):
+        results = res[epyc.Experiment.RESULTS]
+        assert results['counts'].dtype == np.int32
+        assert np.array_equal(results['counts'], [2 * i for i in range(10)])
+        assert results['rates'].dtype == np.float32
+        assert np.allclose(results['rates'], [2 / (i + 1.0) for i in range(10)])
+        assert (results['total'], results['label']) == (90, 'x2')
+        assert res[epyc.Experiment.METADATA][epyc.RepeatedExperiment.REPETITIONS] == 2
+
+
+def test_partly_written_record_dropped(tmp_path):
+    """A record cut short by a crash is dropped on opening, and later results follow on from the complete ones."""
+    name = str(tmp_path / 'study.nb')
+    nb = BinaryLabNotebook(name, create=True)
+    e = SeriesExperiment()
+    for x in range(3):
+        nb.addResult(e.set({'x': x}).run())
+    nb.close()
+    size = os.path.getsize(name)
+
+    with open(name, 'ab') as f:
+        f.write(BinaryLabNotebook._encode_result(nb, e.set({'x': 3}).run())[:60])
+
+    nb = BinaryLabNotebook(name)
+    assert len(nb.results()) == 3
+    assert os.path.getsize(name) == size
+    nb.addResult(e.set({'x': 4}).run())
+    nb.close()
+
+    assert sorted(r[epyc.Experiment.PARAMETERS]['x'] for r in BinaryLabNotebook(name).results()) == [0, 1, 2, 4]
+
+
+def test_lookup_by_canonical_parameters(tmp_path):
+    """Results are found whether numbers are given as ints or floats, and along a sweep with the rest fixed."""
+    name = str(tmp_path / 'study.nb')
+    nb = BinaryLabNotebook(name, create=True)
+    e = SeriesExperiment()
+    for x in range(5):
+        for y in ['a', 'b']:
+            nb.addResult(e.set({'x': x, 'y': y}).run())
+    nb.close()
+
+    nb = BinaryLabNotebook(name)
+    assert len(nb.resultsFor({'x': 2.0, 'y': 'a'})) == 1
+    along = nb.resultsAlong({'x': 0, 'y': 'b'}, 'x', low=1, high=3)
+    assert list(along.keys()) == [1.0, 2.0, 3.0]
+    assert all(rs[0][epyc.Experiment.PARAMETERS] == {'x': x, 'y': 'b'} for (x, rs) in along.items())
+
+
+def test_index_rebuilt(tmp_path):
+    """A missing index is rebuilt from the notebook, and one left behind by a crash picks up the unindexed results."""
+    name = str(tmp_path / 'study.nb')
+    nb = BinaryLabNotebook(name, create=True)
+    e = SeriesExperiment()
+    for x in range(3):
+        nb.addResult(e.set({'x': x}).run())
+    nb.close()
+    with open(name + BinaryLabNotebook.INDEX_SUFFIX, 'rb') as f:
+        index = f.read()
+
+    os.remove(name + BinaryLabNotebook.INDEX_SUFFIX)
+    assert len(BinaryLabNotebook(name).resultsFor({'x': 1})) == 1
+
+    with open(name + BinaryLabNotebook.INDEX_SUFFIX, 'wb') as f:
+        f.write(index[:-20])
+    nb = BinaryLabNotebook(name)
+    assert [len(nb.resultsFor({'x': x})) for x in range(3)] == [1, 1, 1]
+
+
+def test_aggregate_results_match_live_notebook(tmp_path):
+    """Aggregating results read back from the file gives what aggregating the same results held live does, to
+    float32 precision."""
+    params = VariabilityStudyParams(days_to_run=40)
+    rng = np.random.default_rng(5)
+    live = epyc.LabNotebook()
+    nb = BinaryLabNotebook(str(tmp_path / 'study.nb'), create=True)
+    for _ in range(10):
+        res = {epyc.Experiment.PARAMETERS: asdict(params),
+               epyc.Experiment.METADATA: {epyc.Experiment.STATUS: True},
+               epyc.Experiment.RESULTS: {'daily_infections': rng.poisson(20.0, rng.integers(30, 50)).tolist(),
+                                         'daily_r': rng.normal(1.0, 0.3, 40).tolist(),
+                                         'graph_cov': rng.random()}}
+        live.addResult(res)
+        nb.addResult(res)
+    nb.close()
+
+    expected = BaseExperiment.aggregate_results(live, params)
+    read = BaseExperiment.aggregate_results(BinaryLabNotebook(str(tmp_path / 'study.nb')), params)
+
+    for key in ['daily_infections', 'daily_r']:
+        for field in ['mean', 'high', 'low']:
+            assert np.allclose(getattr(read[key], field), getattr(expected[key], field), rtol=1e-6, atol=1e-6)
+    assert np.isclose(read['graph_cov'], expected['graph_cov'])
+
+
+def test_from_json(tmp_path):
+    """A JSON notebook converts to a binary one, with parameters it lacks given their defaults, and a missing JSON
+    notebook is an error."""
+    json_name = str(tmp_path / 'study.json')
+    json_nb = epyc.JSONLabNotebook(json_name, create=True, description='series')
+    e = SeriesExperiment()
+    for x in range(3):
+        json_nb.addResult(e.set({'x': x}).run())
+    json_nb.commit()
+
+    nb = BinaryLabNotebook.from_json(json_name, defaults={'x': 0, 'y': 'a'})
+    assert nb.description() == 'series'
+    assert [len(nb.resultsFor({'x': x, 'y': 'a'})) for x in range(3)] == [1, 1, 1]
+    assert np.array_equal(nb.resultsFor({'x': 2, 'y': 'a'})[0][epyc.Experiment.RESULTS]['counts'],
+                          [2 * i for i in range(10)])
+    nb.close()
+    assert len(BinaryLabNotebook(str(tmp_path / 'study.nb')).results()) == 3
+
+    with pytest.raises(FileNotFoundError):
+        BinaryLabNotebook.from_json(str(tmp_path / 'missing.json'))
@@ -0,0 +1,29 @@
+"""
+Module contains tests for the network variability study.
+"""
+import numpy as np
+
+from dataclasses import asdict, replace
+
+from covidsim.datastructures import VariabilityStudyParams
+from covidsim.experiments.network_variability_study import NetworkVariabilityExperiment
+
+
+def test_metrics_only_matches_full_networks():
+    """Metrics taken from sampled degree sequences agree, over a number of runs, with those of wired networks
+    trimmed to their giant components."""
+    params = VariabilityStudyParams(population=3000, network_param_1=2.0, network_param_2=10.0,
+                                    variability_method='balanced_polynomial', variability_param_1=3.0,
+                                    randomize_network=True, seed=11)
+
+    means = []
+    for metrics_only in [False, True]:
+        p = replace(params, metrics_only=metrics_only)
+        e = NetworkVariabilityExperiment(p)
+        results = [e.set(asdict(p)).run()['results'] for _ in range(10)]
+        means.append({k: np.mean([r[k] for r in results]) for k in results[0]})
+
+    (full, sampled) = means
+    for k in ['population_size', 'graph_cov', 'mean_individual_susceptibility', 'mean_exposure_susceptibility',
+              'exposure_susceptibility_cov']:
+        assert abs(sampled[k] - full[k]) < 0.02 * full[k], k
@@ -0,0 +1,91 @@
+"""
+Module contains tests for the process-pool lab.
+"""
+import os
+import time
+
+from dataclasses import asdict
+
+import epyc
+
+from covidsim.datastructures import VariabilityStudyParams
+from covidsim.experiments.parallel_lab import ParallelLab
+from covidsim.experiments.variability_study import VariabilityExperiment
+
+
+class ScaledExperiment(epyc.Experiment):
+    """Scales x by the study parameter.  x = 1 raises an exception, and x = 2 kills the worker process."""
+
+    def __init__(self, study_params):
+        super(ScaledExperiment, self).__init__()
+        self.study_params = study_params
+
+    def do(self, params):
+        if params['x'] == 1:
+            raise ValueError('x = 1')
+        if params['x'] == 2:
+            os._exit(1)
+        return {'y': params['x'] * self.study_params}
+
+
+def test_parallel_lab_records_every_run():
+    """Every repetition at every point gets a result, with failures and worker crashes recorded as failed results."""
+    nb = epyc.LabNotebook()
+    lab = ParallelLab(nb, cores=1)
+    lab['x'] = [0, 1, 2, 3]
+
+    lab.runExperiment(epyc.RepeatedExperiment(ScaledExperiment(10), 3))
+
+    results = nb.results()
+    assert len(results) == 12
+    for res in results:
+        x = res[epyc.Experiment.PARAMETERS]['x']
+        assert res[epyc.Experiment.METADATA][epyc.Experiment.STATUS] == (x not in [1, 2])
+        if x in [0, 3]:
+            assert res[epyc.Experiment.RESULTS]['y'] == 10 * x
+    repetitions = sorted(res[epyc.Experiment.METADATA][epyc.RepeatedExperiment.I] for res in results)
+    assert repetitions == [0] * 4 + [1] * 4 + [2] * 4
+
+
+class SlowExperiment(ScaledExperiment):
+    """ScaledExperiment, taking long enough over the runs that don't crash for them to be in flight when x = 2 does."""
+
+    def do(self, params):
+        if params['x'] != 2:
+            time.sleep(0.5)
+        return super(SlowExperiment, self).do(params)
+
+
+def test_crash_fails_only_its_own_run():
+    """A run that kills its worker is the only one recorded as failed, though it broke the runs in flight beside it."""
+    nb = epyc.LabNotebook()
+    lab = ParallelLab(nb, cores=4)
+    lab['x'] = [0, 2, 3, 4, 5, 6, 7, 8]
+
+    lab.runExperiment(SlowExperiment(10))
+
+    results = nb.results()
+    assert len(results) == 8
+    for res in results:
+        x = res[epyc.Experiment.PARAMETERS]['x']
+        assert res[epyc.Experiment.METADATA][epyc.Experiment.STATUS] == (x != 2)
+        if x != 2:
+            assert res[epyc.Experiment.RESULTS]['y'] == 10 * x
+
+
+def test_shared_network_gives_same_results():
+    """Workers attaching the experiment's network from shared memory give the same results as building their own."""
+    params = VariabilityStudyParams(population=300, pInfected=0.05, pRemove=0.04, time_scale=0.5, days_to_run=50,
+                                    variability_method='gamma', variability_param_1=0.3, seed=3, dynamics='discrete')
+    e = VariabilityExperiment(params)
+
+    runs = []
+    for shared in [False, True]:
+        nb = epyc.LabNotebook()
+        lab = ParallelLab(nb, cores=1, shared_network=shared)
+        for (k, v) in asdict(params).items():
+            lab[k] = v
+        lab.runExperiment(epyc.RepeatedExperiment(e, 2))
+        runs.append(sorted([r[epyc.Experiment.RESULTS] for r in nb.results()], key=lambda r: r['total_infected']))
+
+    assert runs[0] == runs[1]
@@ -0,0 +1,26 @@
+"""
+Module contains tests for the parameter index.
+"""
+import numpy as np
+
+from covidsim.experiments.parameter_index import ParameterIndex, parameter_hash
+
+
+def test_hash_is_canonical():
+    """Parameters hash the same whatever the type of their numbers, but booleans are not numbers."""
+    assert parameter_hash({'a': 10, 'b': 0.5}) == parameter_hash({'b': np.float32(0.5), 'a': 10.0})
+    assert parameter_hash({'a': [1, 2]}) == parameter_hash({'a': (1.0, 2.0)})
+    assert parameter_hash({'a': 1}) != parameter_hash({'a': True})
+    assert parameter_hash({'a': 1}) != parameter_hash({'a': 1, 'b': None})
+
+
+def test_entries_persist(tmp_path):
+    name = str(tmp_path / 'study.idx')
+    index = ParameterIndex(name, create=True)
+    for (h, offset) in [(5, 16), (7, 80), (5, 144)]:
+        index.add(h, offset)
+    index.close()
+
+    index = ParameterIndex(name)
+    assert (len(index), index.last_offset()) == (3, 144)
+    assert (index.offsets(5), index.offsets(7), index.offsets(9)) == ([16, 144], [80], [])
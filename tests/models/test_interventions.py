@@ -0,0 +1,36 @@
+"""
+Module contains tests for compiling intervention parameters into a schedule.
+"""
+import pytest
+
+from covidsim.models.interventions import InterventionSchedule
+
+
+def test_overlapping_interventions_combine_independently():
+    """Overlapping interventions each get a chance to cancel an infection."""
+    schedule = InterventionSchedule.from_params({'intervention_1': "10, 20, 0.5",
+                                                 'intervention_2': "15, 30, 0.2",
+                                                 'intervention_3': None,
+                                                 'intervention_4': "0, 100, 1.0"})
+
+    assert schedule.probability(9) == 0.0
+    assert schedule.probability(10) == pytest.approx(0.5)
+    assert schedule.probability(15) == pytest.approx(1.0 - 0.5 * 0.8)
+    assert schedule.probability(20) == pytest.approx(1.0 - 0.5 * 0.8)
+    assert schedule.probability(21) == pytest.approx(0.2)
+    assert schedule.probability(31) == 0.0
+    assert schedule.probability(1000) == 0.0
+
+
+def test_no_interventions_never_cancel():
+    schedule = InterventionSchedule.from_params({'intervention_1': None})
+
+    assert len(schedule) == 0
+    assert schedule.probability(0) == 0.0
+
+
+def test_change_days_mark_window_edges():
+    schedule = InterventionSchedule.from_params({'intervention_1': "10, 20, 0.5",
+                                                 'intervention_2': "15, 30, 0.2"})
+
+    assert schedule.change_days() == [10, 15, 21, 31]
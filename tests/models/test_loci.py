@@ -0,0 +1,50 @@
+"""
+Module contains tests for the weighted loci.
+"""
+import pytest
+
+from covidsim.models.loci import WeightedElements
+
+
+def test_weighted_draw_is_proportional_to_weight():
+    """Elements are drawn in proportion to their weights, and discarded elements are never drawn."""
+    weights = {'a': 1.0, 'b': 3.0, 'c': 0.0, 'd': 5.0}
+    elements = WeightedElements(lambda e: weights[e])
+    for e in weights:
+        elements.add(e)
+    elements.discard('d')
+
+    assert len(elements) == 3
+    assert elements.total_weight() == pytest.approx(4.0)
+
+    draws = [elements.draw() for _ in range(4000)]
+
+    assert 'c' not in draws
+    assert 'd' not in draws
+    assert draws.count('b') / len(draws) == pytest.approx(0.75, abs=0.05)
+
+
+def test_weighted_elements_grow_past_initial_capacity():
+    elements = WeightedElements(lambda e: 1.0)
+    for e in range(1000):
+        elements.add(e)
+    for e in range(0, 1000, 2):
+        elements.discard(e)
+
+    assert elements.total_weight() == pytest.approx(500.0)
+    assert elements.draw() % 2 == 1
+
+
+def test_draw_rejects_rounding_residue():
+    """A running total left positive by rounding, over elements that all weigh 0, is rejected rather than drawn
+    from forever."""
+    weights = {'a': 0.1, 'b': 0.2, 'c': 0.0}
+    elements = WeightedElements(lambda e: weights[e], uniform=lambda: 0.5)
+    for e in weights:
+        elements.add(e)
+    elements.discard('a')
+    elements.discard('b')
+    assert elements.total_weight() > 0.0
+
+    with pytest.raises(ValueError):
+        elements.draw()
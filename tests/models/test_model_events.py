@@ -0,0 +1,39 @@
+"""
+Module contains tests for the built-in events and trackers.
+"""
+import numpy as np
+
+from covidsim.models.model_events import ArrayTracker, SusceptibleInfectionsTracker
+
+
+class CountingTracker(ArrayTracker):
+    COLUMNS = {'daily_events': ArrayTracker.COUNT, 'daily_mean': ArrayTracker.MEAN}
+
+
+def test_array_tracker_reduces_columns():
+    """Columns are preallocated for the run, and count and mean reductions are taken per day."""
+    params = {'days_to_run': 4}
+    results = dict()
+    CountingTracker.initialize_results(results, params)
+
+    days = np.array([0, 0, 2, 7])
+    CountingTracker.accumulate(results, 'daily_events', days)
+    CountingTracker.accumulate(results, 'daily_mean', days, [1.0, 3.0, 5.0, 100.0])
+
+    final = dict()
+    CountingTracker.finalize_results(results, final, params)
+
+    assert final['daily_events'] == [2, 0, 1, 0]
+    assert final['daily_mean'] == [2.0, 0.0, 5.0, 0.0]
+
+
+def test_susceptible_infections_without_infections():
+    """A run with no infections reports zero mean susceptibility every day."""
+    params = {'days_to_run': 3}
+    results = dict()
+    SusceptibleInfectionsTracker.initialize_results(results, params)
+
+    final = dict()
+    SusceptibleInfectionsTracker.finalize_results(results, final, params)
+
+    assert final['daily_susceptible_infections'] == [0.0, 0.0, 0.0]
@@ -0,0 +1,44 @@
+"""
+Module contains tests for the array-backed node state store.
+"""
+import networkx as nx
+import numpy as np
+
+from covidsim.models.node_state import NodeStateStore
+
+
+def test_store_picks_up_initialized_attributes():
+    """Attributes set on the network before the run are copied into the arrays."""
+    g = nx.path_graph(3)
+    g.nodes[1]['susceptibility'] = 0.25
+    g.nodes[2]['day_infected'] = -1
+
+    state = NodeStateStore(g)
+
+    assert state.has_susceptibility
+    assert state.susceptibility[state.index[1]] == 0.25
+    assert np.isnan(state.susceptibility[state.index[0]])
+    assert state.day_infected[state.index[2]] == -1
+
+
+def test_view_reads_and_writes_through_to_arrays():
+    """The compatibility view behaves like a networkx attribute dict backed by the store."""
+    g = nx.path_graph(3)
+    g.nodes[0]['label'] = 'a'
+    state = NodeStateStore(g)
+
+    state.record_infection(state.index[0], state.index[1], 4)
+    state.record_removal(state.index[1], 10)
+
+    infecting = state.view(0)
+    exposed = state.view(1)
+
+    assert infecting['infected'] == 1
+    assert infecting['infecting_days'] == {1: 4}
+    assert infecting['label'] == 'a'
+    assert 'susceptibility' not in infecting
+    assert exposed['days_infected'] == 6
+
+    exposed['susceptibility'] = 0.5
+    assert state.susceptibility[state.index[1]] == 0.5
+    assert state.mean_infection_length() == 6
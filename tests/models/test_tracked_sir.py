@@ -1,10 +1,16 @@
 """
 Module contains tests specifically for the TrackedSIR class.
 """
+import random
 import pytest
+import numpy as np
+import pluggy
+
+import covidsim.models
 
 from dataclasses import asdict
 
+from covidsim.models import model_events
 from covidsim.models.tracked_sir import TrackedSIR
 from covidsim.datastructures import StudyParams
 
@@ -17,9 +23,13 @@ def standard_params() -> StudyParams:
 @pytest.fixture
 def model(powerlaw_cutoff_network, standard_params) -> TrackedSIR:
 
-    model = TrackedSIR()
-    model._g = powerlaw_cutoff_network
-    model.build(standard_params)
+    pm = pluggy.PluginManager("infectionmodel")
+    pm.add_hookspecs(model_events)
+    pm.register(model_events.InfectionsAndInfectedTracker)
+
+    model = TrackedSIR(pm.hook)
+    model.setNetwork(powerlaw_cutoff_network)
+    model.build(asdict(standard_params))
 
     model.setUp(asdict(standard_params))
 
@@ -39,3 +49,117 @@ def test_infect_increases_infections(model: TrackedSIR):
 
     assert i2 > i1
 
+
+
+def test_compartment_counters_match_network(model: TrackedSIR):
+    """Running compartment counters agree with a full scan of the network after events."""
+    day = 1
+    for e in list(model._g.edges)[:50]:
+        if model.getCompartment(e[0]) == TrackedSIR.SUSCEPTIBLE:
+            model.infect(day, e)
+            day += 1
+    for n in list(model._g.nodes)[:10]:
+        if model.getCompartment(n) == TrackedSIR.INFECTED:
+            model.remove(day, n)
+
+    res = model.results()
+    for c in [TrackedSIR.SUSCEPTIBLE, TrackedSIR.INFECTED, TrackedSIR.REMOVED]:
+        assert res[c] == len(model.compartment(c))
+
+
+def test_infection_batches_deliver_each_infection_once(powerlaw_cutoff_network, standard_params):
+    """Batch trackers see every logged infection exactly once, a day at a time."""
+
+    class BatchRecorder:
+        batches = []
+
+        @staticmethod
+        @covidsim.models.hookimpl
+        def track_infection_batch(infecting_nodes, exposed_nodes, days, node_state, results, graph):
+            BatchRecorder.batches.append((infecting_nodes, exposed_nodes, days))
+
+    pm = pluggy.PluginManager("infectionmodel")
+    pm.add_hookspecs(model_events)
+    pm.register(model_events.InfectionsAndInfectedTracker)
+    pm.register(BatchRecorder)
+
+    model = TrackedSIR(pm.hook)
+    model.setNetwork(powerlaw_cutoff_network)
+    model.build(asdict(standard_params))
+    model.setUp(asdict(standard_params))
+
+    day = 1
+    for e in list(model._g.edges)[:50]:
+        if model.getCompartment(e[0]) == TrackedSIR.SUSCEPTIBLE:
+            model.infect(day, e)
+            day += 1
+    model.results()
+
+    assert sum(len(d) for (_, _, d) in BatchRecorder.batches) == len(model.node_state.log_day)
+    assert all(len(set(d.tolist())) == 1 for (_, _, d) in BatchRecorder.batches)
+
+
+def _list_append_series(initial_infected, events, days_to_run, mil):
+    """The daily series as TrackedSIR built them by appending to lists, before they were preallocated."""
+    di, ci = [], []
+    for (kind, day) in events:
+        if kind == 'infect':
+            while len(di) - 1 < day:
+                di.append(0)
+            di[day] += 1
+        if len(ci) == 0:
+            ci.append(initial_infected)
+        while len(ci) - 1 < day:
+            ci.append(ci[-1])
+        ci[day] += 1 if kind == 'infect' else -1
+
+    di = (di + [0] * days_to_run)[:days_to_run]
+    ci = (ci + [0] * days_to_run)[:days_to_run]
+    daily_r = [((di[x + 1] / ci[x]) if ci[x] != 0 else 0) * mil for x in range(len(ci) - 1)]
+    return di, ci, daily_r
+
+
+def test_daily_series_match_list_append(powerlaw_cutoff_network):
+    """The preallocated daily series match the old list-append ones over a seeded run with days without events and
+    events after days_to_run."""
+    params = asdict(StudyParams(population=100, pInfected=0.1, days_to_run=30, time_scale=1.0))
+    pm = pluggy.PluginManager("infectionmodel")
+    pm.add_hookspecs(model_events)
+    pm.register(model_events.InfectionsAndInfectedTracker)
+
+    model = TrackedSIR(pm.hook)
+    model.setNetwork(powerlaw_cutoff_network)
+    model.build(params)
+    random.seed(4)
+    np.random.seed(4)
+    model.setUp(params)
+    initial_infected = model.compartment_counts[TrackedSIR.INFECTED]
+
+    rng = np.random.default_rng(4)
+    events = []
+    t = 0.0
+    while t < 45:
+        t += rng.exponential(1.0)
+        infected = [n for n in model._g.nodes if model.getCompartment(n) == TrackedSIR.INFECTED]
+        si = [(n, m) for m in infected for n in model._g.neighbors(m)
+              if model.getCompartment(n) == TrackedSIR.SUSCEPTIBLE]
+        if len(infected) == 0:
+            break
+        if len(si) > 0 and rng.random() < 0.75:
+            model.infect(t, si[rng.integers(len(si))])
+            events.append(('infect', int(t)))
+        else:
+            model.remove(t, infected[rng.integers(len(infected))])
+            events.append(('remove', int(t)))
+    res = model.results()
+
+    event_days = {day for (_, day) in events}
+    assert any(day not in event_days for day in range(max(event_days)))
+    assert max(event_days) >= params['days_to_run']
+
+    di, ci, daily_r = _list_append_series(initial_infected, events, params['days_to_run'],
+                                          res['mean_infection_length'])
+    assert res['daily_infections'] == di
+    assert res['currently_infected'] == ci
+    assert len(res['daily_r']) == len(daily_r) == params['days_to_run'] - 1
+    assert np.allclose(res['daily_r'], daily_r)
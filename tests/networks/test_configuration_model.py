@@ -0,0 +1,37 @@
+"""
+Module contains tests for the array-based configuration model.
+"""
+import networkx as nx
+import numpy as np
+
+from covidsim.networks.configuration_model import configuration_model_csr, connected_component_labels
+
+
+def test_configuration_model_is_simple_and_connected():
+    """The result is the giant component, without self-loops or multi-edges, and converts to networkx."""
+    degrees = np.random.default_rng(1).integers(1, 6, 1000)
+    degrees[0] += np.sum(degrees) % 2
+
+    g = configuration_model_csr(degrees, np.random.default_rng(2))
+    nxg = g.to_networkx()
+
+    assert nxg.number_of_nodes() == g.number_of_nodes()
+    assert nxg.number_of_edges() == g.number_of_edges()
+    assert nx.number_of_selfloops(nxg) == 0
+    assert nx.is_connected(nxg)
+    assert np.all(g.degrees() <= np.max(degrees))
+
+
+def test_component_labels_match_networkx():
+    """Nodes share a label exactly when they are in the same connected component."""
+    rng = np.random.default_rng(3)
+    u, v = rng.integers(0, 500, 300), rng.integers(0, 500, 300)
+    label = connected_component_labels(500, u, v)
+
+    g = nx.Graph()
+    g.add_nodes_from(range(500))
+    g.add_edges_from(zip(u.tolist(), v.tolist()))
+    for component in nx.connected_components(g):
+        nodes = sorted(component)
+        assert np.all(label[nodes] == nodes[0])
+    assert len(np.unique(label)) == nx.number_connected_components(g)
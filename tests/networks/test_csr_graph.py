@@ -0,0 +1,61 @@
+"""
+Module contains tests for the compact array representation of networks.
+"""
+import networkx as nx
+import numpy as np
+import pluggy
+
+from dataclasses import asdict
+
+from covidsim.datastructures import VariabilityStudyParams
+from covidsim.dynamics.discrete_time import DiscreteTimeSIR
+from covidsim.models import model_events
+from covidsim.networks.configuration_model import csr_from_edges
+from covidsim.networks.csr_graph import CSRGraph
+from covidsim.networks.graph_cache import GraphCache
+from covidsim.networks.network_manipulations import NetworkInitialization
+
+
+def layered_network() -> CSRGraph:
+    g = nx.barabasi_albert_graph(400, 2, seed=1)
+    (u, v) = np.array(list(g.edges)).T
+    return csr_from_edges(g.number_of_nodes(), u, v, layers=(u + v) % 3)
+
+
+def test_compact_dtypes():
+    """Offsets and neighbours are int32, and layers uint8, taking 4 bytes per node and 10 per edge."""
+    g = layered_network()
+
+    assert g.offsets.dtype == np.int32
+    assert g.neighbours.dtype == np.int32
+    assert g.edge_layers.dtype == np.uint8
+    assert g.nbytes() == 4 * (g.number_of_nodes() + 1) + 10 * g.number_of_edges()
+
+
+def test_layers_follow_edges(tmp_path):
+    """Each edge keeps its layer in both directions, through networkx and through the network cache."""
+    g = layered_network()
+    src = np.repeat(np.arange(g.number_of_nodes()), g.degrees())
+    assert np.array_equal(g.edge_layers, (src + g.neighbours) % 3)
+
+    h = CSRGraph.from_networkx(g.to_networkx())
+    assert np.array_equal(h.edge_layers, g.edge_layers)
+
+    cache = GraphCache(str(tmp_path))
+    key = GraphCache.key('layered', 400, 0, 0, 0, 0)
+    assert np.array_equal(cache.get(key, lambda: g).edge_layers, g.edge_layers)
+
+
+def test_discrete_engine_runs_on_compact_graph():
+    """The discrete-time engine runs directly on a compact graph with its nodes initialized in place."""
+    params = asdict(VariabilityStudyParams(pInfected=0.1, pRemove=0.04, time_scale=0.5, days_to_run=50,
+                                           variability_method='gamma', variability_param_1=0.3,
+                                           dynamics='discrete'))
+    g = layered_network()
+    NetworkInitialization(params, np.random.default_rng(2)).setup_nodes(g)
+
+    pm = pluggy.PluginManager("infectionmodel")
+    pm.add_hookspecs(model_events)
+    res = DiscreteTimeSIR(pm.hook).run(g, params)
+
+    assert res['S'] + res['I'] + res['R'] == g.number_of_nodes()
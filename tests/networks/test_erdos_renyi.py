@@ -0,0 +1,22 @@
+"""
+Module contains tests for the sparse Erdos-Renyi generator.
+"""
+import networkx as nx
+import numpy as np
+
+from covidsim.networks.erdos_renyi import erdos_renyi_csr
+
+
+def test_every_pair_can_be_chosen():
+    """With p = 1 every pair of nodes is joined exactly once."""
+    g = erdos_renyi_csr(40, 1.0, np.random.default_rng(1))
+
+    assert nx.is_isomorphic(g.to_networkx(), nx.complete_graph(40))
+
+
+def test_mean_degree():
+    """The mean degree is close to p(n - 1)."""
+    g = erdos_renyi_csr(20000, 4.0 / 20000, np.random.default_rng(2))
+
+    assert g.number_of_nodes() == 20000
+    assert abs(np.mean(g.degrees()) - 4.0) < 0.1
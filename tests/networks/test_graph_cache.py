@@ -0,0 +1,34 @@
+"""
+Module contains tests for the on-disk network cache.
+"""
+import numpy as np
+
+from covidsim.networks.erdos_renyi import erdos_renyi_csr
+from covidsim.networks.graph_cache import GraphCache
+
+
+def test_cached_networks_are_memory_mapped(tmp_path):
+    """A network is built once, and then loaded as memory-mapped arrays equal to the ones built."""
+    cache = GraphCache(str(tmp_path))
+    key = GraphCache.key('erdos_renyi', 500, 4.0, 10.0, 100, [1, 0])
+    built = []
+
+    def build():
+        built.append(erdos_renyi_csr(500, 4.0 / 500, np.random.default_rng(1)))
+        return built[-1]
+
+    first = cache.get(key, build)
+    second = cache.get(key, build)
+
+    assert len(built) == 1
+    assert isinstance(second.neighbours, np.memmap)
+    assert np.array_equal(first.offsets, built[0].offsets)
+    assert np.array_equal(second.neighbours, built[0].neighbours)
+
+
+def test_keys_are_normalized(tmp_path):
+    """Parameters that are equal but of different numeric types identify the same network."""
+    cache = GraphCache(str(tmp_path))
+
+    assert cache.path(GraphCache.key('powerlaw_cutoff', np.int64(500), np.float64(2.0), 10, 100, 3)) == \
+        cache.path(GraphCache.key('powerlaw_cutoff', 500, 2, 10.0, 100, 3))
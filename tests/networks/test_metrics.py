@@ -0,0 +1,33 @@
+"""
+Module contains tests for the network summary statistics.
+"""
+import networkx as nx
+import numpy as np
+
+from covidsim.networks.csr_graph import CSRGraph
+from covidsim.networks.metrics import exposure_susceptibility, network_metrics
+
+
+def test_metrics_match_direct_computation():
+    """The statistics match computing them directly from the networkx graph, including susceptibilities above 1."""
+    g = nx.barabasi_albert_graph(500, 3, seed=1)
+    rng = np.random.default_rng(2)
+    for n in g.nodes:
+        g.nodes[n]['susceptibility'] = rng.gamma(0.5, 1.0)
+    csr = CSRGraph.from_networkx(g)
+
+    res = network_metrics(csr.degrees(), csr.node_attributes['susceptibility'])
+
+    degrees = [d for (_, d) in g.degree]
+    exposure = [1.0 - (1.0 - g.nodes[n]['susceptibility']) ** d for (n, d) in g.degree]
+    assert np.isclose(res['graph_cov'], np.std(degrees) / np.mean(degrees))
+    assert np.isclose(res['mean_exposure_susceptibility'], np.mean(exposure))
+    assert np.isclose(res['exposure_susceptibility_cov'], np.std(exposure) / np.mean(exposure))
+
+
+def test_exposure_keeps_precision_for_small_susceptibilities():
+    """1 - (1 - s)^k is close to ks for tiny s, where the direct formula loses every digit."""
+    exposure = exposure_susceptibility(np.array([1e-17, 0.5, 1.0]), np.array([4, 2, 0]))
+
+    assert np.allclose(exposure, [4e-17, 0.75, 0.0], rtol=1e-12, atol=0.0)
+
@@ -0,0 +1,66 @@
+"""
+Module contains tests for network initialization and the susceptibility samplers.
+"""
+import networkx as nx
+import numpy as np
+import pytest
+
+from covidsim.networks.erdos_renyi import erdos_renyi_csr
+from covidsim.networks.network_manipulations import NetworkInitialization, register_susceptibility_sampler, \
+    susceptibility_sampler
+
+
+def test_networkx_nodes_initialized():
+    """Every node of a networkx graph is uninfected and gets a susceptibility."""
+    g = nx.path_graph(5)
+    params = {'variability_method': 'constant', 'variability_param_1': 0.3, 'variability_param_2': None}
+    NetworkInitialization(params, np.random.default_rng(1)).setup_nodes(g)
+
+    for (_, data) in g.nodes(data=True):
+        assert data == {'infected': 0, 'day_infected': -1, 'susceptibility': 0.3}
+
+
+def test_csr_matches_networkx():
+    """A CSRGraph gets the same susceptibilities, as arrays, as the equivalent networkx graph."""
+    g = erdos_renyi_csr(1000, 0.005, np.random.default_rng(2))
+    h = g.to_networkx()
+    params = {'variability_method': 'gamma', 'variability_param_1': 0.5, 'variability_param_2': 0.8}
+    NetworkInitialization(params, np.random.default_rng(3)).setup_nodes(g)
+    NetworkInitialization(params, np.random.default_rng(3)).setup_nodes(h)
+
+    assert np.array_equal(g.node_attributes['susceptibility'], [h.nodes[n]['susceptibility'] for n in h.nodes])
+    assert np.all(g.node_attributes['day_infected'] == -1)
+    assert abs(np.mean(g.node_attributes['susceptibility']) - 0.5) < 0.05
+
+
+def test_balanced_polynomial_matches_per_node_code():
+    """Every susceptibility after the first is complemented, as the per-node code drew them."""
+    u = np.random.default_rng(4).random(1000) ** 3.0
+    s = susceptibility_sampler('balanced_polynomial')(1000, 3.0, None, np.random.default_rng(4))
+
+    assert s[0] == u[0]
+    assert np.allclose(s[1:], 1.0 - u[1:])
+
+
+def test_alternating_polynomial_alternates():
+    """Every other susceptibility is complemented, so the mean tends towards 0.5."""
+    s = susceptibility_sampler('alternating_polynomial')(100000, 3.0, None, np.random.default_rng(4))
+
+    assert np.mean(s[0::2]) < 0.3
+    assert np.mean(s[1::2]) > 0.7
+    assert abs(np.mean(s) - 0.5) < 0.01
+
+
+def test_registered_sampler():
+    """User-registered samplers are selected by name, and unknown names are rejected."""
+    @register_susceptibility_sampler('test_linear')
+    def linear(n, low, high, rng):
+        return np.linspace(low, high, n)
+
+    g = nx.empty_graph(3)
+    params = {'variability_method': 'test_linear', 'variability_param_1': 0.0, 'variability_param_2': 1.0}
+    NetworkInitialization(params).setup_nodes(g)
+    assert [g.nodes[n]['susceptibility'] for n in g.nodes] == [0.0, 0.5, 1.0]
+
+    with pytest.raises(ValueError):
+        NetworkInitialization({'variability_method': 'no_such_method'}).setup_nodes(g)
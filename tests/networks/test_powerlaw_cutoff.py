@@ -1,11 +1,35 @@
 """
 Module contains tests just for the powerlaw cutoff network functions.
 """
-import pytest
+import numpy as np
 
-from covidsim.networks.powerlaw_cutoff import make_powerlaw_with_cutoff, generate_from
+from covidsim.networks.powerlaw_cutoff import make_powerlaw_with_cutoff, generate_from, degree_distribution, \
+    powerlaw_with_cutoff_distribution
 
-@pytest.fixture
-def powerlaw_cutoff_network(population: int = 100):
+def test_generate_from_is_reproducible():
+    """Generators seeded alike give the same network."""
+    p = make_powerlaw_with_cutoff(2, 10)
+    g1 = generate_from(200, p, rng=np.random.default_rng(7))
+    g2 = generate_from(200, p, rng=np.random.default_rng(7))
 
-    return generate_from(population, make_powerlaw_with_cutoff(2, 10))
+    assert sorted(g1.edges) == sorted(g2.edges)
+
+
+def test_degree_distribution_matches_model_function():
+    """The degree table covers degrees 1 to maxdeg - 1 in proportion to the model function."""
+    p = make_powerlaw_with_cutoff(2, 10)
+    pmf, cdf = degree_distribution(p, 50)
+
+    assert len(pmf) == 49
+    assert cdf[-1] == 1.0
+    assert np.isclose(pmf[1] / pmf[0], float(p(2)) / float(p(1)))
+
+
+def test_powerlaw_with_cutoff_distribution_is_shared():
+    """The cached table agrees with tabulating the model function, and is computed once."""
+    pmf, cdf = powerlaw_with_cutoff_distribution(2.0, 10.0, 50)
+    expected_pmf, expected_cdf = degree_distribution(make_powerlaw_with_cutoff(2.0, 10.0), 50)
+
+    assert np.allclose(pmf, expected_pmf)
+    assert np.allclose(cdf, expected_cdf)
+    assert powerlaw_with_cutoff_distribution(2.0, 10.0, 50)[1] is cdf
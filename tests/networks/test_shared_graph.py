@@ -0,0 +1,30 @@
+"""
+Module contains tests for networks shared between processes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from covidsim.networks.erdos_renyi import erdos_renyi_csr
+from covidsim.networks.shared_graph import SharedGraph, attach
+
+
+def summarise(handle):
+    g = attach(handle)
+    return g.number_of_edges(), int(np.sum(g.degrees())), float(np.sum(g.node_attributes['susceptibility'])), \
+        g.neighbours.flags.writeable
+
+
+def test_attached_network_matches_published():
+    """Another process attaching a published network sees the same arrays, read-only."""
+    g = erdos_renyi_csr(1000, 0.005, np.random.default_rng(1))
+    g.node_attributes['susceptibility'] = np.random.default_rng(2).random(1000)
+
+    with SharedGraph(g) as shared:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            (edges, degrees, susceptibility, writeable) = pool.submit(summarise, shared.handle).result()
+
+    assert edges == g.number_of_edges()
+    assert degrees == np.sum(g.degrees())
+    assert susceptibility == np.sum(g.node_attributes['susceptibility'])
+    assert not writeable
@@ -0,0 +1,22 @@
+"""
+Module contains tests for building values ahead of time.
+"""
+from covidsim.utils.prefetch import Prefetcher
+
+
+def square(x):
+    return x * x
+
+
+def test_values_built_ahead_or_on_demand():
+    """Values are the same whether they were built ahead or not, and only depth values are built ahead."""
+    p = Prefetcher(square, 2)
+    try:
+        assert p.get(1, (1,), [(k, (k,)) for k in range(2, 6)]) == 1
+        assert list(p._ahead) == [2, 3]
+        assert p.get(3, (3,), [(k, (k,)) for k in range(4, 8)]) == 9
+        assert list(p._ahead) == [4, 5]
+        assert p.get(10, (10,)) == 100
+        assert len(p._ahead) == 0
+    finally:
+        p.close()
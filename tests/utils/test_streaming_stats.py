@@ -0,0 +1,52 @@
+"""
+Module contains tests for the streaming aggregation of timeseries.
+"""
+import numpy as np
+
+from covidsim.datastructures import SeriesRange
+from covidsim.utils.streaming_stats import QuantileSketch, SeriesAggregator
+
+
+def test_merged_aggregators_match_create_from_list():
+    """Series of uneven lengths split between two aggregators give the SeriesRange that create_from_list does."""
+    rng = np.random.default_rng(1)
+    data = [list(rng.poisson(20.0, rng.integers(40, 60))) for _ in range(200)]
+
+    a, b = SeriesAggregator(50, smoothing=5), SeriesAggregator(50, smoothing=5)
+    for (i, series) in enumerate(data):
+        (a if i % 2 == 0 else b).add(series)
+    a.merge(b)
+    res = a.series_range()
+    expected = SeriesRange(None, None, None).create_from_list([s[:50] for s in data], expected_length=50, smoothing=5)
+
+    assert len(a) == 200
+    for field in ['mean', 'high', 'low']:
+        assert np.allclose(getattr(res, field), getattr(expected, field))
+    assert sorted(res.quantiles.keys()) == [0.05, 0.5, 0.95]
+
+
+def test_quantiles_within_relative_accuracy():
+    """Each quantile is within the relative accuracy of the exact quantile, for values of either sign."""
+    rng = np.random.default_rng(2)
+    values = rng.lognormal(0.0, 2.0, (1000, 3)) * np.array([1.0, -1.0, 1.0])
+    values[::3, 2] = 0.0
+
+    sketch = QuantileSketch(3, relative_accuracy=0.02)
+    for row in values:
+        sketch.add(row)
+
+    for q in [0.05, 0.5, 0.95]:
+        lower = np.quantile(values, q, axis=0, method='lower')
+        higher = np.quantile(values, q, axis=0, method='higher')
+        estimate = sketch.quantile(q)
+        assert np.all((estimate >= np.minimum(lower, higher) - 0.02 * np.abs(lower)) &
+                      (estimate <= np.maximum(lower, higher) + 0.02 * np.abs(higher)))
+
+
+def test_nans_ignored_by_quantiles():
+    sketch = QuantileSketch(2)
+    for v in [1.0, 2.0, 3.0]:
+        sketch.add(np.array([v, np.nan]))
+
+    median = sketch.quantile(0.5)
+    assert np.isclose(median[0], 2.0, rtol=0.01) and np.isnan(median[1])